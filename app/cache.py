@@ -0,0 +1,509 @@
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from collections import OrderedDict
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with optional TTL and hit/miss counters.
+
+    on_remove, if given, is called with the key of every entry dropped by
+    eviction or expiry (not by delete or clear), outside the cache lock.
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None,
+                 on_remove: Optional[Callable[[Hashable], None]] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_remove = on_remove
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._expires: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._data:
+                if self.ttl is not None and self._expires[key] < time.monotonic():
+                    self._data.pop(key)
+                    self._expires.pop(key)
+                    self.expirations += 1
+                    self.misses += 1
+                    expired = key
+                else:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return self._data[key]
+            else:
+                self.misses += 1
+                return None
+        self._removed([expired])
+        return None
+
+    def set(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+        evicted_keys = []
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.ttl is not None:
+                self._expires[key] = time.monotonic() + self.ttl
+            while len(self._data) > self.max_size:
+                evicted, _ = self._data.popitem(last=False)
+                self._expires.pop(evicted, None)
+                self.evictions += 1
+                evicted_keys.append(evicted)
+        self._removed(evicted_keys)
+
+    def _removed(self, keys: List[Hashable]):
+        if self.on_remove is not None:
+            for key in keys:
+                self.on_remove(key)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different copies share a cache key"""
+    return " ".join(text.split())
+
+class EmbeddingCache:
+    """Content-addressed embedding cache with a memory tier and a SQLite tier.
+
+    Keys are sha256(model name + normalized text), so vectors computed by a
+    different model can never be returned. Disk rows from another model are
+    purged when the cache is opened.
+    """
+
+    def __init__(self, model_name: str, memory_size: int, disk_path: Optional[str] = None,
+                 disk_max_entries: int = 0):
+        self.model_name = model_name
+        self.memory = LRUCache(memory_size)
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+        self.disk_hits = 0
+        self._disk_writes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        if disk_path:
+            self._open_disk()
+
+    def _open_disk(self):
+        directory = os.path.dirname(os.path.abspath(self.disk_path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.disk_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, "
+            "accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_accessed ON embeddings (accessed_at)")
+        # Invalidate vectors produced by a previously configured model
+        self._conn.execute("DELETE FROM embeddings WHERE model != ?", (self.model_name,))
+        self._conn.commit()
+
+    def key_for(self, text: str) -> str:
+        digest = hashlib.sha256(f"{self.model_name}\0{normalize_text(text)}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Look up each text; returns None for misses"""
+        keys = [self.key_for(text) for text in texts]
+        results: List[Optional[np.ndarray]] = [self.memory.get(key) for key in keys]
+
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        if missing and self._conn is not None:
+            found = self._disk_get([keys[i] for i in missing])
+            for i in missing:
+                vector = found.get(keys[i])
+                if vector is not None:
+                    results[i] = vector
+                    self.memory.set(keys[i], vector)
+                    self.disk_hits += 1
+        return results
+
+    def put_many(self, texts: List[str], vectors: List[np.ndarray]):
+        rows = []
+        now = time.time()
+        for text, vector in zip(texts, vectors):
+            key = self.key_for(text)
+            vector = np.asarray(vector, dtype=np.float32)
+            self.memory.set(key, vector)
+            rows.append((key, self.model_name, vector.tobytes(), now))
+
+        if rows and self._conn is not None:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector, accessed_at) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+                self._disk_writes += len(rows)
+                if self.disk_max_entries and self._disk_writes >= max(1, self.disk_max_entries // 10):
+                    self._trim_disk()
+
+    def _disk_get(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET accessed_at = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _trim_disk(self):
+        """Evict least recently used disk rows beyond disk_max_entries"""
+        self._disk_writes = 0
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            "SELECT key FROM embeddings ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,)
+        )
+        self._conn.commit()
+
+    def clear(self):
+        self.memory.clear()
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM embeddings")
+                self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.memory.get_stats()
+        stats["disk_hits"] = self.disk_hits
+        lookups = self.memory.hits + self.memory.misses
+        stats["hit_rate"] = (self.memory.hits + self.disk_hits) / lookups if lookups else 0.0
+        if self._conn is not None:
+            with self._lock:
+                stats["disk_entries"] = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return stats
+
+class SearchResultCache:
+    """TTL + LRU cache of vector search results, invalidated per source.
+
+    Query embeddings are bucketed (rounded) before hashing so that
+    near-identical queries share an entry. Entries are indexed by their
+    source filter; a write to a source drops that source's entries and every
+    unfiltered entry. Evicted and expired entries leave the index too.
+    """
+
+    def __init__(self, max_size: int, ttl: float, bucket_precision: int = 2):
+        self.results = LRUCache(max_size, ttl=ttl, on_remove=self._forget)
+        self.bucket_precision = bucket_precision
+        self.invalidations = 0
+        self._keys_by_source: Dict[Optional[str], set] = {}
+        self._lock = threading.Lock()
+
+    def key_for(self, query_embedding: np.ndarray, source_id: Optional[str], limit: int,
+                score_threshold: float) -> tuple:
+        bucket = np.round(np.asarray(query_embedding, dtype=np.float32), self.bucket_precision)
+        digest = hashlib.sha1(bucket.tobytes()).hexdigest()
+        return (digest, source_id, limit, round(score_threshold, 4))
+
+    def get(self, key: tuple) -> Optional[List[Dict[str, Any]]]:
+        results = self.results.get(key)
+        # Callers may decorate results, so never hand out the cached dicts
+        return [dict(result) for result in results] if results is not None else None
+
+    def set(self, key: tuple, results: List[Dict[str, Any]]):
+        if self.results.max_size <= 0:
+            return
+        # Index first, so an eviction racing this set still finds the key to drop
+        with self._lock:
+            self._keys_by_source.setdefault(key[1], set()).add(key)
+        self.results.set(key, [dict(result) for result in results])
+
+    def _forget(self, key: tuple):
+        with self._lock:
+            keys = self._keys_by_source.get(key[1])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_source[key[1]]
+
+    def invalidate_sources(self, source_ids: Optional[List[str]] = None):
+        """Drop entries affected by writes to source_ids (None means all sources)"""
+        with self._lock:
+            self.invalidations += 1
+            if source_ids is None:
+                self._keys_by_source.clear()
+                self.results.clear()
+                return
+            for source_id in set(source_ids) | {None}:
+                for key in self._keys_by_source.pop(source_id, ()):
+                    self.results.delete(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.results.get_stats()
+        stats["invalidations"] = self.invalidations
+        return stats
+
+def generation_cache_key(model: str, system_prompt: Optional[str], user_prompt: str,
+                         context_ids: List[str], temperature: float, max_tokens: int) -> str:
+    """sha256 over everything that determines an LLM response"""
+    material = json.dumps(
+        [model, system_prompt, user_prompt, [str(chunk_id) for chunk_id in context_ids], temperature, max_tokens],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class GenerationCache:
+    """Cache of LLM responses keyed by generation_cache_key.
+
+    Entries live in an in-memory LRU or, with a Redis connection, in Redis
+    where every process shares them. Both expire after ttl seconds.
+
+    get and set are coroutines: Redis commands run on a worker thread so a
+    slow or unreachable Redis never blocks the event loop. Redis errors are
+    counted and treated as misses, and after one Redis is skipped for
+    retry_interval seconds.
+    """
+
+    def __init__(self, max_size: int, ttl: float, redis_conn=None, prefix: str = "llm_cache:",
+                 retry_interval: float = 30.0):
+        self.ttl = ttl
+        self.redis = redis_conn
+        self.prefix = prefix
+        self.retry_interval = retry_interval
+        self.memory = LRUCache(max_size, ttl=ttl) if redis_conn is None else None
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.errors = 0
+        self._redis_down_until = 0.0
+
+    @property
+    def backend(self) -> str:
+        return "redis" if self.redis is not None else "memory"
+
+    def _redis_failed(self, error: Exception):
+        self.errors += 1
+        self._redis_down_until = time.monotonic() + self.retry_interval
+        print(f"⚠️ Generation cache Redis error, skipping Redis for {self.retry_interval:.0f}s: {error}")
+
+    async def get(self, key: str) -> Optional[str]:
+        value = None
+        if self.redis is not None:
+            if time.monotonic() >= self._redis_down_until:
+                try:
+                    value = await asyncio.to_thread(self.redis.get, self.prefix + key)
+                    value = value.decode("utf-8") if value is not None else None
+                except Exception as e:
+                    self._redis_failed(e)
+        else:
+            value = self.memory.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str):
+        if not value:
+            return
+        if self.redis is not None:
+            if time.monotonic() < self._redis_down_until:
+                return
+            try:
+                await asyncio.to_thread(
+                    self.redis.set, self.prefix + key, value.encode("utf-8"), ex=max(1, int(self.ttl))
+                )
+            except Exception as e:
+                self._redis_failed(e)
+        else:
+            self.memory.set(key, value)
+
+    def record_bypass(self):
+        self.bypasses += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        stats = {
+            "backend": self.backend,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "errors": self.errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+        if self.redis is not None:
+            stats["redis_available"] = time.monotonic() >= self._redis_down_until
+        if self.memory is not None:
+            stats["size"] = len(self.memory)
+            stats["max_size"] = self.memory.max_size
+            stats["evictions"] = self.memory.evictions
+        return stats
+
+class SemanticCache:
+    """Near-duplicate cache of generation results.
+
+    Each entry is a unit-length request embedding plus the result it
+    produced, stored in a fixed-size matrix so a lookup is one matrix-vector
+    product. Candidates are entries in the same scope (e.g. output format),
+    younger than ttl, with cosine similarity >= threshold. When full, the
+    least recently used entry is replaced.
+
+    The embedding model only sees the start of a long text, so two long
+    requests sharing an opening can embed identically. Each entry therefore
+    also keeps the word set of its full request text, and a candidate is
+    only served if the word sets overlap (Jaccard) by at least min_overlap.
+    """
+
+    MAX_CANDIDATES = 5
+
+    def __init__(self, dimension: int, max_size: int, threshold: float, ttl: float,
+                 min_overlap: float = 0.9):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_size = max_size
+        self.min_overlap = min_overlap
+        self._vectors = np.zeros((max_size, dimension), dtype=np.float32)
+        self._scopes: List[Optional[str]] = [None] * max_size
+        self._words: List[Optional[frozenset]] = [None] * max_size
+        self._values: List[Any] = [None] * max_size
+        self._stored_at = np.full(max_size, -np.inf)
+        self._used_at = np.full(max_size, -np.inf)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self.lexical_rejections = 0
+        self._hit_similarities: List[float] = []
+
+    @staticmethod
+    def _unit(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _word_set(text: str) -> frozenset:
+        return frozenset(normalize_text(text).lower().split())
+
+    @staticmethod
+    def _overlap(a: frozenset, b: frozenset) -> float:
+        if not a and not b:
+            return 1.0
+        return len(a & b) / len(a | b)
+
+    def get(self, vector: np.ndarray, scope: str, text: str) -> Optional[tuple]:
+        """(value, similarity) of the closest live entry that also matches text, else None"""
+        query = self._unit(vector)
+        words = self._word_set(text)
+        with self._lock:
+            if self._size:
+                now = time.monotonic()
+                similarities = self._vectors[:self._size] @ query
+                live = (self._stored_at[:self._size] >= now - self.ttl) & np.array(
+                    [entry_scope == scope for entry_scope in self._scopes[:self._size]]
+                )
+                similarities = np.where(live, similarities, -np.inf)
+                order = np.argsort(-similarities)[:self.MAX_CANDIDATES]
+                for index in order:
+                    index = int(index)
+                    if similarities[index] < self.threshold:
+                        break
+                    if self._overlap(words, self._words[index]) < self.min_overlap:
+                        self.lexical_rejections += 1
+                        continue
+                    self._used_at[index] = now
+                    self.hits += 1
+                    self._hit_similarities = (self._hit_similarities + [float(similarities[index])])[-1000:]
+                    return self._values[index], float(similarities[index])
+            self.misses += 1
+            return None
+
+    def set(self, vector: np.ndarray, scope: str, value: Any, text: str):
+        if self.max_size <= 0:
+            return
+        vector = self._unit(vector)
+        words = self._word_set(text)
+        with self._lock:
+            now = time.monotonic()
+            if self._size < self.max_size:
+                slot = self._size
+                self._size += 1
+            else:
+                slot = int(np.argmin(self._used_at))
+                self.evictions += 1
+            self._vectors[slot] = vector
+            self._scopes[slot] = scope
+            self._words[slot] = words
+            self._values[slot] = value
+            self._stored_at[slot] = now
+            self._used_at[slot] = now
+
+    def record_bypass(self):
+        self.bypasses += 1
+
+    def clear(self):
+        with self._lock:
+            self._size = 0
+            self._scopes = [None] * self.max_size
+            self._words = [None] * self.max_size
+            self._values = [None] * self.max_size
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        similarities = self._hit_similarities
+        return {
+            "threshold": self.threshold,
+            "min_overlap": self.min_overlap,
+            "ttl": self.ttl,
+            "size": self._size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "evictions": self.evictions,
+            "lexical_rejections": self.lexical_rejections,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_hit_similarity": sum(similarities) / len(similarities) if similarities else None
+        }
@@ -0,0 +1,139 @@
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+import hashlib
+import re
+import zlib
+
+from .cache import normalize_text
+
+# Sentence ends followed by whitespace, or a blank line between paragraphs
+_BOUNDARY_RE = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+class TextSpan(NamedTuple):
+    text: str
+    start: int  # Character offsets into the source file
+    end: int
+    token_count: int
+
+def iter_sentences(file: TextIO, read_size: int = 64 * 1024) -> Iterator[Tuple[str, int, int]]:
+    """Yield (sentence, start, end) from a text file without reading it whole.
+
+    Only the unfinished tail of the last read is kept between reads.
+    """
+    buffer = ""
+    buffer_start = 0
+    while True:
+        data = file.read(read_size)
+        buffer += data
+        position = 0
+        for match in _BOUNDARY_RE.finditer(buffer):
+            # A boundary touching the end of the buffer may continue in the next read
+            if data and match.end() == len(buffer):
+                break
+            sentence = buffer[position:match.start()]
+            if sentence.strip():
+                yield sentence, buffer_start + position, buffer_start + match.start()
+            position = match.end()
+        buffer = buffer[position:]
+        buffer_start += position
+        # Text without sentence breaks: cut at the last space to bound memory
+        if data and len(buffer) > 4 * read_size:
+            cut = buffer.rfind(" ", 0, len(buffer) - read_size)
+            if cut > 0:
+                yield buffer[:cut], buffer_start, buffer_start + cut
+                buffer = buffer[cut + 1:]
+                buffer_start += cut + 1
+        if not data:
+            break
+    if buffer.strip():
+        yield buffer, buffer_start, buffer_start + len(buffer)
+
+class TokenChunker:
+    """Packs sentences into chunks of at most max_tokens tokens.
+
+    Consecutive chunks share up to overlap_tokens tokens of whole trailing
+    sentences. Sentences longer than the budget are split on word boundaries.
+
+    If `anchor` is given, a chunk also ends after any sentence for which it
+    returns True once the chunk is at least half full. Anchors depend only on
+    sentence content, so after an edit the boundaries of the old and new text
+    realign at the next anchor and the unchanged chunks hash identically.
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int], max_tokens: int, overlap_tokens: int,
+                 anchor: Optional[Callable[[str], bool]] = None):
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 2)
+        self.anchor = anchor
+
+    def chunk(self, sentences: Iterable[Tuple[str, int, int]]) -> Iterator[TextSpan]:
+        window: List[TextSpan] = []
+        window_tokens = 0
+        # False while the window holds only overlap already sent in the last chunk
+        has_new_units = False
+        for sentence in sentences:
+            for unit in self._fit(sentence):
+                if window and window_tokens + unit.token_count > self.max_tokens:
+                    if has_new_units:
+                        yield self._join(window)
+                        window, window_tokens = self._overlap(window)
+                    # Drop overlap that would leave no room for the new unit
+                    while window and window_tokens + unit.token_count > self.max_tokens:
+                        window_tokens -= window.pop(0).token_count
+                window.append(unit)
+                window_tokens += unit.token_count
+                has_new_units = True
+                if self.anchor and window_tokens >= self.max_tokens // 2 and self.anchor(unit.text):
+                    yield self._join(window)
+                    window, window_tokens = self._overlap(window)
+                    has_new_units = False
+        if has_new_units:
+            yield self._join(window)
+
+    def _fit(self, sentence: Tuple[str, int, int]) -> Iterator[TextSpan]:
+        text, start, end = sentence
+        tokens = self.count_tokens(text)
+        if tokens <= self.max_tokens:
+            yield TextSpan(text, start, end, tokens)
+            return
+
+        # Split an oversized sentence into word runs that fit the budget
+        piece_start = None
+        piece_end = start
+        piece_tokens = 0
+        for word in re.finditer(r"\S+", text):
+            word_tokens = self.count_tokens(word.group())
+            if piece_start is not None and piece_tokens + word_tokens > self.max_tokens:
+                yield TextSpan(text[piece_start - start:piece_end - start], piece_start, piece_end, piece_tokens)
+                piece_start = None
+                piece_tokens = 0
+            if piece_start is None:
+                piece_start = start + word.start()
+            piece_end = start + word.end()
+            piece_tokens += word_tokens
+        if piece_start is not None:
+            yield TextSpan(text[piece_start - start:piece_end - start], piece_start, piece_end, piece_tokens)
+
+    def _overlap(self, window: List[TextSpan]) -> Tuple[List[TextSpan], int]:
+        kept: List[TextSpan] = []
+        tokens = 0
+        for unit in reversed(window):
+            if tokens + unit.token_count > self.overlap_tokens:
+                break
+            kept.insert(0, unit)
+            tokens += unit.token_count
+        return kept, tokens
+
+    def _join(self, window: List[TextSpan]) -> TextSpan:
+        text = " ".join(unit.text.strip() for unit in window)
+        return TextSpan(text, window[0].start, window[-1].end, sum(unit.token_count for unit in window))
+
+def sentence_anchor(text: str, period: int = 4) -> bool:
+    """Content-defined boundary: roughly one sentence in `period` is an anchor"""
+    return zlib.crc32(normalize_text(text).encode("utf-8")) % period == 0
+
+def content_hash(text: str) -> str:
+    """sha256 of the whitespace-normalized text, used to diff re-ingested chunks"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
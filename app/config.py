@@ -30,10 +30,31 @@ class Settings(BaseSettings):
     # Redis settings
     REDIS_URL: str = "redis://localhost:6379"
     
+    # Worker settings
+    EMBEDDING_WORKER_CONCURRENCY: int = 1  # Processes per pool; embedding is CPU-bound
+    GENERATION_WORKER_CONCURRENCY: int = 4  # LLM calls are I/O-bound
+    EMBEDDING_JOB_TIMEOUT: int = 3600  # Seconds
+    GENERATION_JOB_TIMEOUT: int = 600
+    REDIS_RETRY_INTERVAL: float = 30.0  # Seconds to use the in-process runner before retrying Redis
+    
     # Qdrant settings
     QDRANT_URL: str = "http://localhost:6333"
     QDRANT_API_KEY: Optional[str] = None
     
+    # Vector store settings
+    VECTOR_BACKEND: str = "qdrant"  # qdrant, local
+    LOCAL_VECTOR_PATH: str = "./vector_index"
+    LOCAL_VECTOR_INDEX: str = "flat"  # flat (exact), hnsw (needs hnswlib)
+    VECTOR_QUANTIZATION: str = "none"  # none, int8, binary
+    VECTOR_RESCORE_FACTOR: int = 4  # Quantized candidates re-scored per requested result
+    VECTOR_BINARY_CANDIDATE_FRACTION: float = 0.1  # Binary search re-scores at least this share of rows
+    VECTOR_UPSERT_BATCH_SIZE: int = 256
+    VECTOR_UPSERT_CONCURRENCY: int = 4
+    VECTOR_UPSERT_RETRIES: int = 3
+    VECTOR_PAYLOAD_INCLUDE_TEXT: bool = False  # Chunk text is read back from the database
+    SEARCH_CACHE_SIZE: int = 5000  # Cached search result sets
+    SEARCH_CACHE_TTL: float = 300.0  # Seconds; also bounds staleness from writes in other processes
+    
     # OpenAI settings
     OPENAI_API_KEY: Optional[str] = None
     OPENAI_BASE_URL: str = "https://api.openai.com/v1"
@@ -42,10 +63,47 @@ class Settings(BaseSettings):
     LLM_MODEL: str = "gpt-3.5-turbo"
     LLM_TEMPERATURE: float = 0.7
     LLM_MAX_TOKENS: int = 1000
+    LLM_SERVICE_URL: str = "http://localhost:8001"  # Self-hosted LLM used by GenerationService
+    GENERATION_CONCURRENCY: int = 4  # Content types generated at once per request
+    GENERATION_TYPE_TIMEOUT: float = 60.0  # Seconds per content type
+    GENERATION_CACHE_BACKEND: str = "memory"  # memory, redis (shared by all processes), none
+    GENERATION_CACHE_SIZE: int = 1000  # Responses kept by the memory backend
+    GENERATION_CACHE_TTL: float = 24 * 3600.0  # Seconds
+    GENERATION_CACHE_REDIS_TIMEOUT: float = 0.5  # Seconds per Redis command before counting a miss
+    SEMANTIC_CACHE_ENABLED: bool = False  # Serve /ai/generate results for near-duplicate requests
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95  # Minimum cosine similarity of request embeddings
+    SEMANTIC_CACHE_MIN_OVERLAP: float = 0.9  # Minimum word-set overlap of the full request texts
+    SEMANTIC_CACHE_SIZE: int = 2000  # Requests kept; the least recently used is replaced
+    SEMANTIC_CACHE_TTL: float = 24 * 3600.0  # Seconds
+    LLM_HTTP_TIMEOUT: float = 30.0  # Seconds per provider request
+    LLM_HTTP_CONNECT_TIMEOUT: float = 5.0
+    LLM_HTTP_MAX_CONNECTIONS: int = 100  # Pooled keep-alive connections, all providers
+    LLM_HTTP_MAX_PER_HOST: int = 20
+    LLM_HTTP_KEEPALIVE: float = 30.0  # Seconds an idle connection is kept open
+    LLM_HEDGE_ENABLED: bool = True  # Start the next provider when one runs past its p95
+    LLM_HEDGE_DEFAULT_DELAY: float = 2.0  # Seconds, until a provider has enough latency samples
+    LLM_HEDGE_MIN_DELAY: float = 0.05
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_LATENCY_WINDOW: int = 200  # Recent calls per provider used for percentiles
+    LLM_BREAKER_WINDOW: int = 20  # Recent calls per provider the circuit breaker judges
+    LLM_BREAKER_WINDOW_SECONDS: float = 60.0  # Older calls no longer count
+    LLM_BREAKER_MIN_CALLS: int = 5
+    LLM_BREAKER_ERROR_RATE: float = 0.5  # Opens at this share of failed calls...
+    LLM_BREAKER_SLOW_CALL_SECONDS: float = 10.0
+    LLM_BREAKER_SLOW_CALL_RATE: float = 0.5  # ...or of calls slower than the limit above
+    LLM_BREAKER_COOLDOWN: float = 30.0  # Seconds open before one probe call is let through
+    LLM_HEALTH_WEIGHT: float = 2.0  # Places a provider drops in routing order at zero health
     
     # Embedding settings
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
     EMBEDDING_DIMENSION: int = 384
+    EMBEDDING_WARMUP: bool = False  # Load the embedding model at startup
+    EMBEDDING_BATCH_WINDOW_MS: float = 5.0  # How long to collect queries into one batch
+    EMBEDDING_BATCH_MAX_SIZE: int = 64
+    EMBEDDING_BATCH_MAX_PENDING: int = 1024  # Queued queries before callers wait
+    EMBEDDING_CACHE_SIZE: int = 10000  # In-memory LRU entries
+    EMBEDDING_CACHE_PATH: Optional[str] = "./embedding_cache.db"  # None disables the disk tier
+    EMBEDDING_CACHE_DISK_MAX_ENTRIES: int = 500000
     
     # Security settings
     SECRET_KEY: str = "your-secret-key-here"
@@ -54,11 +112,16 @@ class Settings(BaseSettings):
     # File upload settings
     MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
     ALLOWED_EXTENSIONS: list = [".txt", ".pdf", ".mp4", ".mp3", ".wav", ".docx"]
+    DEDUP_UPLOADS: bool = True  # Identical files share one stored blob and reuse chunks/embeddings
     
     # Content generation settings
-    MAX_CHUNK_SIZE: int = 1000
-    CHUNK_OVERLAP: int = 200
+    MAX_CHUNK_SIZE: int = 1000  # Tokens, capped by the embedding model's sequence length
+    CHUNK_OVERLAP: int = 200  # Tokens, at most half of the chunk size
     MAX_RETRIEVAL_RESULTS: int = 10
+    INGEST_BATCH_SIZE: int = 64  # Chunks embedded and stored together while streaming a file
+    INGEST_QUEUE_SIZE: int = 2  # Batches buffered between ingestion pipeline stages
+    CHUNK_INSERT_BATCH_SIZE: int = 1000  # Rows per executemany transaction in bulk_insert_chunks
+    TRANSCRIPT_MAX_BYTES: int = 5 * 1024 * 1024  # Larger text files are not copied into transcript
     
     # Environment
     ENVIRONMENT: str = "development"
@@ -0,0 +1,263 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import asyncio
+import importlib
+import json
+import threading
+import time
+import traceback
+import uuid
+
+from sqlalchemy import or_
+
+from .config import settings
+from .database import SessionLocal
+from .models import BackgroundJob
+from .workers import GENERATION_QUEUE
+
+# Every job, whether it runs on an RQ worker or in-process, has a row in
+# background_jobs with its state, progress, timings and error, and runs
+# through execute_job(), which keeps that row current.
+#
+# The in-process runner replaces the RQ queues when Redis is not installed
+# or not reachable. Its rows are written before the job is submitted, so
+# work queued or running when the process stops is picked up again by
+# recover_jobs() on the next start. It assumes a single API process owns
+# the table, as in a single-node deployment. A recovered job may already
+# have run part way, so job functions must be safe to run again (ingestion
+# clears the source's chunks before it starts).
+
+TERMINAL_STATES = ("finished", "failed")
+
+class LocalJob(NamedTuple):
+    id: str
+    origin: str
+
+def _func_name(func: Callable) -> str:
+    return f"{func.__module__}.{func.__qualname__}"
+
+def _resolve(func_name: str) -> Callable:
+    module_name, _, attribute = func_name.rpartition(".")
+    return getattr(importlib.import_module(module_name), attribute)
+
+def _jsonable(value: Any) -> Any:
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return repr(value)
+
+def record_job(job_id: str, queue: str, func_name: str, args: List[Any], kwargs: Dict[str, Any],
+               backend: str, user_id: Optional[str] = None):
+    db = SessionLocal()
+    try:
+        db.add(BackgroundJob(
+            id=job_id, queue=queue, backend=backend, func_name=func_name,
+            args=args, kwargs=kwargs, user_id=user_id, status="queued", progress=0.0
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+def update_job(job_id: str, **values):
+    db = SessionLocal()
+    try:
+        db.query(BackgroundJob).filter(BackgroundJob.id == job_id).update(values)
+        db.commit()
+    finally:
+        db.close()
+    _notify(job_id)
+
+_current = threading.local()
+
+def execute_job(job_id: str, func_name: str, args: List[Any], kwargs: Dict[str, Any]) -> Any:
+    """Run a job and record its lifecycle; the entry point on both backends"""
+    update_job(job_id, status="started", started_at=datetime.utcnow(), error=None)
+    _current.job_id = job_id
+    try:
+        result = _resolve(func_name)(*args, **kwargs)
+    except Exception:
+        update_job(job_id, status="failed", error=traceback.format_exc(), ended_at=datetime.utcnow())
+        print(f"❌ Job {job_id} ({func_name}) failed")
+        raise
+    finally:
+        _current.job_id = None
+    update_job(job_id, status="finished", progress=1.0, result=_jsonable(result), ended_at=datetime.utcnow())
+    return result
+
+def progress_reporter(min_interval: float = 1.0) -> Callable[[float, Optional[str]], None]:
+    """Callback recording progress of the job running in this thread.
+
+    The callback may be called from any thread; writes are throttled to
+    one per min_interval seconds. Outside a job it does nothing.
+    """
+    job_id = getattr(_current, "job_id", None)
+    last_write = [0.0]
+    lock = threading.Lock()
+
+    def report(progress: float, message: Optional[str] = None):
+        if job_id is None:
+            return
+        with lock:
+            now = time.monotonic()
+            if now - last_write[0] < min_interval:
+                return
+            last_write[0] = now
+        update_job(job_id, progress=round(min(max(progress, 0.0), 1.0), 4), message=message)
+
+    return report
+
+def job_to_dict(job: BackgroundJob) -> Dict[str, Any]:
+    ended_or_now = job.ended_at or datetime.utcnow()
+    return {
+        "job_id": job.id,
+        "queue": job.queue,
+        "status": job.status,
+        "progress": job.progress or 0.0,
+        "message": job.message,
+        "error": job.error,
+        "result": job.result,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "ended_at": job.ended_at.isoformat() if job.ended_at else None,
+        "queued_seconds": ((job.started_at or ended_or_now) - job.created_at).total_seconds() if job.created_at else None,
+        "run_seconds": (ended_or_now - job.started_at).total_seconds() if job.started_at else None
+    }
+
+# Waiters for job updates made in this process. Updates from other
+# processes (RQ workers) are not signalled, so waiters also re-read the row
+# on a short interval.
+_waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+_waiters_lock = threading.Lock()
+
+def _notify(job_id: str):
+    with _waiters_lock:
+        waiters = _waiters.pop(job_id, [])
+    for loop, event in waiters:
+        loop.call_soon_threadsafe(event.set)
+
+async def wait_for_job_update(job_id: str, timeout: float) -> bool:
+    """Wait until this process updates the job or timeout passes; True if it was updated"""
+    event = asyncio.Event()
+    waiter = (asyncio.get_running_loop(), event)
+    with _waiters_lock:
+        _waiters.setdefault(job_id, []).append(waiter)
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        with _waiters_lock:
+            waiters = _waiters.get(job_id)
+            if waiters and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    _waiters.pop(job_id, None)
+
+class LocalJobQueue:
+    """Runs jobs on a bounded thread pool with the enqueue() call of an RQ Queue"""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"jobs-{name}")
+
+    def enqueue(self, f: Callable, *args, job_id: Optional[str] = None, job_timeout: Optional[int] = None,
+                owner_id: Optional[str] = None, **kwargs) -> LocalJob:
+        # job_timeout is accepted for API compatibility; threads cannot be killed
+        job_id = job_id or str(uuid.uuid4())
+        record_job(job_id, self.name, _func_name(f), list(args), kwargs, backend="local", user_id=owner_id)
+        return self.submit(job_id, _func_name(f), list(args), kwargs)
+
+    def submit(self, job_id: str, func_name: str, args: List[Any], kwargs: Dict[str, Any]) -> LocalJob:
+        """Run a job whose row already exists"""
+        self._executor.submit(self._run, job_id, func_name, args, kwargs)
+        return LocalJob(job_id, self.name)
+
+    def _run(self, job_id: str, func_name: str, args: List[Any], kwargs: Dict[str, Any]):
+        try:
+            execute_job(job_id, func_name, args, kwargs)
+        except Exception:
+            pass  # Recorded on the job row
+
+    def shutdown(self, wait: bool = False):
+        """Stop taking work; unstarted jobs stay queued in the table for recovery"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+_local_queues: Dict[str, LocalJobQueue] = {}
+_local_queues_lock = threading.Lock()
+
+def _queue_concurrency(name: str) -> int:
+    if name == GENERATION_QUEUE:
+        return settings.GENERATION_WORKER_CONCURRENCY
+    return settings.EMBEDDING_WORKER_CONCURRENCY
+
+def get_local_queue(name: str) -> LocalJobQueue:
+    """Process-wide in-process queue for `name`, sized like its worker pool"""
+    with _local_queues_lock:
+        if name not in _local_queues:
+            _local_queues[name] = LocalJobQueue(name, max_workers=max(1, _queue_concurrency(name)))
+        return _local_queues[name]
+
+def recover_jobs() -> int:
+    """Resubmit in-process jobs left queued or running by a previous process"""
+    db = SessionLocal()
+    try:
+        pending: List[BackgroundJob] = db.query(BackgroundJob).filter(
+            BackgroundJob.status.in_(["queued", "started"]),
+            or_(BackgroundJob.backend == "local", BackgroundJob.backend.is_(None))
+        ).order_by(BackgroundJob.created_at).all()
+        for job in pending:
+            job.status = "queued"
+            job.started_at = None
+        db.commit()
+        for job in pending:
+            get_local_queue(job.queue).submit(job.id, job.func_name, job.args or [], job.kwargs or {})
+        return len(pending)
+    finally:
+        db.close()
+
+def shutdown_local_queues():
+    with _local_queues_lock:
+        for queue in _local_queues.values():
+            queue.shutdown()
+
+class FallbackQueue:
+    """Enqueues on an RQ queue when Redis is reachable, otherwise runs the job in-process.
+
+    A failed Redis enqueue switches to the local queue for
+    REDIS_RETRY_INTERVAL seconds before Redis is tried again. Either way
+    the job gets a background_jobs row; owner_id is stored as its user.
+    """
+
+    def __init__(self, redis_queue, name: str):
+        self.redis_queue = redis_queue
+        self.name = name
+        self._redis_down_until = 0.0
+
+    @property
+    def using_redis(self) -> bool:
+        return self.redis_queue is not None and time.monotonic() >= self._redis_down_until
+
+    def enqueue(self, f: Callable, *args, job_id: Optional[str] = None, job_timeout: Optional[int] = None,
+                owner_id: Optional[str] = None, **kwargs):
+        job_id = job_id or str(uuid.uuid4())
+        func_name = _func_name(f)
+        args = list(args)
+        use_redis = self.using_redis
+        record_job(job_id, self.name, func_name, args, kwargs,
+                   backend="rq" if use_redis else "local", user_id=owner_id)
+
+        if use_redis:
+            try:
+                return self.redis_queue.enqueue(
+                    execute_job, job_id, func_name, args, kwargs,
+                    job_id=job_id, job_timeout=job_timeout, description=func_name
+                )
+            except Exception as e:
+                self._redis_down_until = time.monotonic() + settings.REDIS_RETRY_INTERVAL
+                print(f"⚠️ Redis enqueue failed, running {self.name} jobs in-process: {e}")
+                update_job(job_id, backend="local")
+        return get_local_queue(self.name).submit(job_id, func_name, args, kwargs)
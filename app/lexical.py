@@ -0,0 +1,115 @@
+from typing import List, Dict, Any, Optional, Sequence
+import re
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .models import ContentChunk
+
+# BM25 inverted index over chunk text, kept in an SQLite FTS5 table so every
+# process sharing the database sees chunks as soon as they are committed
+FTS_TABLE = "content_chunks_fts"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def ensure_lexical_index(engine) -> bool:
+    """Create the FTS5 table and backfill it from content_chunks if empty"""
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "chunk_text, chunk_id UNINDEXED, source_id UNINDEXED, "
+            "tokenize='porter unicode61')"
+        ))
+        indexed = conn.execute(text(f"SELECT COUNT(*) FROM {FTS_TABLE}")).scalar()
+        if not indexed:
+            conn.execute(text(
+                f"INSERT INTO {FTS_TABLE} (chunk_text, chunk_id, source_id) "
+                "SELECT chunk_text, id, source_id FROM content_chunks"
+            ))
+    return True
+
+def build_match_query(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 query matching any of its terms"""
+    terms = _TOKEN_RE.findall(query.lower())
+    if not terms:
+        return None
+    # Quote every term so FTS5 operators in user input are taken literally
+    return " OR ".join(f'"{term}"' for term in dict.fromkeys(terms))
+
+class LexicalIndex:
+    def __init__(self, db: Session):
+        self.db = db
+        self.enabled = db.get_bind().dialect.name == "sqlite"
+
+    def add_chunks(self, chunks: Sequence[ContentChunk]):
+        """Index chunks in the caller's transaction"""
+        if not self.enabled or not chunks:
+            return
+        self.db.execute(
+            text(f"INSERT INTO {FTS_TABLE} (chunk_text, chunk_id, source_id) VALUES (:text, :id, :source_id)"),
+            [{"text": chunk.chunk_text, "id": str(chunk.id), "source_id": str(chunk.source_id)} for chunk in chunks]
+        )
+
+    def delete_chunks(self, chunk_ids: Sequence[str]):
+        if not self.enabled or not chunk_ids:
+            return
+        self.db.execute(
+            text(f"DELETE FROM {FTS_TABLE} WHERE chunk_id = :id"),
+            [{"id": str(chunk_id)} for chunk_id in chunk_ids]
+        )
+
+    def search(self, query: str, source_id: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """BM25-ranked chunks; higher scores are better"""
+        match = build_match_query(query)
+        if not self.enabled or match is None:
+            return []
+        sql = (
+            f"SELECT f.chunk_id, f.source_id, -bm25({FTS_TABLE}) AS score, "
+            "c.chunk_text, c.chunk_index, c.start_position, c.end_position, "
+            "c.start_time, c.end_time, c.token_count "
+            f"FROM {FTS_TABLE} f JOIN content_chunks c ON c.id = f.chunk_id "
+            f"WHERE {FTS_TABLE} MATCH :match"
+        )
+        params = {"match": match, "limit": limit}
+        if source_id:
+            sql += " AND f.source_id = :source_id"
+            params["source_id"] = source_id
+        sql += f" ORDER BY bm25({FTS_TABLE}) LIMIT :limit"
+
+        rows = self.db.execute(text(sql), params).fetchall()
+        return [
+            {
+                "id": row.chunk_id,
+                "score": float(row.score),
+                "payload": {
+                    "source_id": row.source_id,
+                    "chunk_text": row.chunk_text,
+                    "chunk_index": row.chunk_index,
+                    "start_position": row.start_position,
+                    "end_position": row.end_position,
+                    "start_time": row.start_time,
+                    "end_time": row.end_time,
+                    "token_count": row.token_count
+                }
+            }
+            for row in rows
+        ]
+
+def reciprocal_rank_fusion(result_lists: Dict[str, List[Dict[str, Any]]], limit: int,
+                           k: int = 60) -> List[Dict[str, Any]]:
+    """Merge ranked result lists by sum(1 / (k + rank)).
+
+    result_lists maps a retriever name ("vector", "lexical") to its results;
+    each fused result keeps the per-retriever scores as "<name>_score".
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for name, results in result_lists.items():
+        for rank, result in enumerate(results, start=1):
+            key = str(result["id"])
+            entry = fused.setdefault(key, {"id": result["id"], "score": 0.0, "payload": dict(result.get("payload") or {})})
+            entry["score"] += 1.0 / (k + rank)
+            entry[f"{name}_score"] = result["score"]
+            for field, value in (result.get("payload") or {}).items():
+                entry["payload"].setdefault(field, value)
+    return sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)[:limit]
@@ -0,0 +1,363 @@
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from collections import deque
+import asyncio
+import threading
+import time
+import weakref
+
+import aiohttp
+
+from .config import settings
+
+class LLMError(Exception):
+    """A provider answered with an error status or an unusable body"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+# One pooled session per event loop. The API has a single loop whose session
+# lives for the app lifetime; a worker job running under asyncio.run() gets
+# its own session and closes it when the job ends.
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Keep-alive, connection-limited session for LLM provider traffic"""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=settings.LLM_HTTP_MAX_CONNECTIONS,
+            limit_per_host=settings.LLM_HTTP_MAX_PER_HOST,
+            keepalive_timeout=settings.LLM_HTTP_KEEPALIVE
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(
+                total=settings.LLM_HTTP_TIMEOUT, sock_connect=settings.LLM_HTTP_CONNECT_TIMEOUT
+            )
+        )
+        _sessions[loop] = session
+    return session
+
+async def close_http_session():
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+async def post_json(url: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None,
+                    timeout: Optional[float] = None) -> Tuple[int, Any]:
+    """POST a JSON body on the pooled session; returns (status, parsed JSON or text)"""
+    request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+    async with get_http_session().post(url, json=payload, headers=headers, timeout=request_timeout) as response:
+        if response.content_type == "application/json":
+            return response.status, await response.json()
+        return response.status, await response.text()
+
+async def openai_chat_completion(messages: List[Dict[str, str]], model: Optional[str] = None,
+                                 temperature: Optional[float] = None, max_tokens: Optional[int] = None,
+                                 timeout: Optional[float] = None) -> str:
+    """Text of the first choice of an OpenAI chat completion"""
+    headers = {
+        "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "model": model or settings.LLM_MODEL,
+        "messages": messages,
+        "temperature": settings.LLM_TEMPERATURE if temperature is None else temperature,
+        "max_tokens": max_tokens or settings.LLM_MAX_TOKENS
+    }
+    # OPENAI_BASE_URL may point at a proxy or an OpenAI-compatible server
+    url = f"{settings.OPENAI_BASE_URL.rstrip('/')}/chat/completions"
+    status, body = await post_json(url, payload, headers=headers, timeout=timeout)
+    if status != 200:
+        raise LLMError(f"OpenAI API error: {status} - {body}", status=status)
+    return body["choices"][0]["message"]["content"]
+
+class LatencyTracker:
+    """Latencies of a provider's recent successful and cancelled calls"""
+
+    def __init__(self, window: int):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.failures = 0
+        self.cancelled = 0
+        self.wins = 0
+
+    def record(self, seconds: float, ok: bool):
+        self.calls += 1
+        if ok:
+            self.samples.append(seconds)
+        else:
+            self.failures += 1
+
+    def record_cancelled(self, seconds: float):
+        """A call cancelled after `seconds` would have taken at least that long.
+
+        Keeping it as a sample stops p95 (and with it the hedge delay)
+        drifting down to the calls that happened to finish.
+        """
+        self.cancelled += 1
+        self.samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "cancelled": self.cancelled,
+            "wins": self.wins,
+            "p50_seconds": self.percentile(50),
+            "p95_seconds": self.percentile(95)
+        }
+
+class CircuitBreaker:
+    """Per-provider circuit breaker over a window of recent calls.
+
+    The window holds the last LLM_BREAKER_WINDOW calls of the past
+    LLM_BREAKER_WINDOW_SECONDS, so a provider demoted for errors regains
+    its health, and its place in routing, once those errors age out.
+
+    closed: calls pass. The breaker opens once the window holds at least
+    LLM_BREAKER_MIN_CALLS calls and either the error rate or the rate of
+    calls slower than LLM_BREAKER_SLOW_CALL_SECONDS reaches its threshold.
+    open: calls are refused without touching the provider. After
+    LLM_BREAKER_COOLDOWN seconds it turns half_open.
+    half_open: a single call goes through as a probe. Success closes the
+    breaker with an empty window; failure opens it for another cooldown.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = "closed"
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._outcomes: Deque[Tuple[float, bool, bool]] = deque(maxlen=settings.LLM_BREAKER_WINDOW)  # (at, failed, slow)
+        self._probe_in_flight = False
+        self._lock = threading.RLock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= settings.LLM_BREAKER_COOLDOWN:
+                self.state = "half_open"
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok: bool, seconds: float):
+        self._record_outcome(not ok, seconds >= settings.LLM_BREAKER_SLOW_CALL_SECONDS, probe_passed=ok)
+
+    def record_cancelled(self, seconds: float):
+        """A permitted call was cancelled after `seconds`.
+
+        A call cancelled before the slow-call threshold says nothing about
+        the provider. One cancelled at or past it was already slow, so it
+        counts as a slow call (and as a failed probe when half_open).
+        Otherwise a provider that is always hedged would never trip on its
+        slow-call rate.
+        """
+        if seconds < settings.LLM_BREAKER_SLOW_CALL_SECONDS:
+            self.release()
+            return
+        self._record_outcome(False, True, probe_passed=False)
+
+    def _record_outcome(self, failed: bool, slow: bool, probe_passed: bool):
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_in_flight = False
+                if probe_passed:
+                    self.state = "closed"
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            self._outcomes.append((time.monotonic(), failed, slow))
+            self._expire()
+            if self.state == "closed" and len(self._outcomes) >= settings.LLM_BREAKER_MIN_CALLS:
+                if (self.error_rate >= settings.LLM_BREAKER_ERROR_RATE
+                        or self.slow_rate >= settings.LLM_BREAKER_SLOW_CALL_RATE):
+                    self._open()
+
+    def release(self):
+        """A permitted call ended without an outcome (e.g. it was cancelled)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _expire(self):
+        cutoff = time.monotonic() - settings.LLM_BREAKER_WINDOW_SECONDS
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            self._expire()
+            return sum(failed for _, failed, _ in self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    @property
+    def slow_rate(self) -> float:
+        with self._lock:
+            self._expire()
+            return sum(slow for _, _, slow in self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    @property
+    def health(self) -> float:
+        """1.0 for a provider with no recent errors or slow calls"""
+        return 1.0 - max(self.error_rate, self.slow_rate)
+
+    def get_stats(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == "open":
+            retry_in = max(0.0, settings.LLM_BREAKER_COOLDOWN - (time.monotonic() - self.opened_at))
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate, 3),
+            "slow_call_rate": round(self.slow_rate, 3),
+            "health": round(self.health, 3),
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected,
+            "retry_in_seconds": retry_in
+        }
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker for the provider `name`"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+class ProviderRouter:
+    """Calls providers in priority order, hedging slow calls with the next provider.
+
+    The first provider starts immediately. If it fails (raises or returns
+    nothing) the next one starts at once; once any running call has taken
+    longer than its own provider's p95 latency, the next one starts
+    alongside it (each call triggers at most one hedge). The first usable
+    result wins and the calls still running are cancelled. Until a provider
+    has LLM_HEDGE_MIN_SAMPLES samples, LLM_HEDGE_DEFAULT_DELAY stands in
+    for its p95.
+    """
+
+    def __init__(self, providers: List[Tuple[str, Callable[..., Awaitable[Any]]]]):
+        self.providers = providers
+        self.latency = {name: LatencyTracker(settings.LLM_LATENCY_WINDOW) for name, _ in providers}
+        self.breakers = {name: get_circuit_breaker(name) for name, _ in providers}
+        self.hedges = 0
+    
+    def ranked_providers(self) -> List[Tuple[str, Callable[..., Awaitable[Any]]]]:
+        """Providers by priority, pushed back by LLM_HEALTH_WEIGHT places per unit of lost health"""
+        return [
+            provider for _, provider in sorted(
+                enumerate(self.providers),
+                key=lambda item: item[0] + (1.0 - self.breakers[item[1][0]].health) * settings.LLM_HEALTH_WEIGHT
+            )
+        ]
+
+    def hedge_delay(self, name: str) -> Optional[float]:
+        if not settings.LLM_HEDGE_ENABLED:
+            return None
+        tracker = self.latency[name]
+        if len(tracker.samples) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return settings.LLM_HEDGE_DEFAULT_DELAY
+        return max(settings.LLM_HEDGE_MIN_DELAY, tracker.percentile(95))
+
+    async def _timed_call(self, name: str, call: Callable[..., Awaitable[Any]], args, kwargs) -> Any:
+        started = time.perf_counter()
+        try:
+            result = await call(*args, **kwargs)
+        except asyncio.CancelledError:
+            # Lost the race; only counts against the provider if it was already slow
+            elapsed = time.perf_counter() - started
+            self.latency[name].record_cancelled(elapsed)
+            self.breakers[name].record_cancelled(elapsed)
+            raise
+        except Exception:
+            self._record(name, False, time.perf_counter() - started)
+            raise
+        self._record(name, bool(result), time.perf_counter() - started)
+        return result
+    
+    def _record(self, name: str, ok: bool, seconds: float):
+        self.latency[name].record(seconds, ok=ok)
+        self.breakers[name].record(ok, seconds)
+
+    async def generate(self, *args, **kwargs) -> Tuple[str, Any]:
+        """(provider name, result) of the first provider with a usable result"""
+        loop = asyncio.get_running_loop()
+        queue = self.ranked_providers()
+        running: Dict[asyncio.Task, str] = {}
+        hedge_at: Dict[asyncio.Task, float] = {}  # Running calls that have not yet triggered a hedge
+        errors: List[str] = []
+
+        def start_next():
+            while queue:
+                name, call = queue.pop(0)
+                # Providers with an open breaker are skipped without a call
+                if not self.breakers[name].allow_request():
+                    errors.append(f"{name}: circuit open")
+                    continue
+                task = asyncio.ensure_future(self._timed_call(name, call, args, kwargs))
+                running[task] = name
+                delay = self.hedge_delay(name)
+                if delay is not None:
+                    hedge_at[task] = loop.time() + delay
+                return
+
+        start_next()
+        try:
+            while running:
+                timeout = max(0.0, min(hedge_at.values()) - loop.time()) if queue and hedge_at else None
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    now = loop.time()
+                    for task in [task for task, at in hedge_at.items() if at <= now]:
+                        del hedge_at[task]
+                    self.hedges += 1
+                    start_next()
+                    continue
+                for task in done:
+                    name = running.pop(task)
+                    hedge_at.pop(task, None)
+                    error = task.exception()
+                    if error is None and task.result():
+                        self.latency[name].wins += 1
+                        return name, task.result()
+                    errors.append(f"{name}: {error or 'no result'}")
+                    # Replace the failed call right away instead of waiting out a hedge delay
+                    start_next()
+        finally:
+            for task in running:
+                task.cancel()
+        raise LLMError("All providers failed: " + "; ".join(errors))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "hedges": self.hedges,
+            "providers": {
+                name: dict(
+                    self.latency[name].get_stats(),
+                    hedge_delay_seconds=self.hedge_delay(name),
+                    breaker=self.breakers[name].get_stats()
+                )
+                for name, _ in self.providers
+            }
+        }
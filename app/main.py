@@ -1,32 +1,58 @@
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 import asyncio
+import copy
 import uuid
 import os
+import time
+import numpy as np
 
 
 from datetime import datetime, timedelta
 import json
 
 from .database import get_db, engine
-from .models import Base, ContentSource, GeneratedContent, ContentChunk, User, Review
+from .database import SessionLocal
+from .models import (
+    Base, ContentSource, GeneratedContent, ContentChunk, User, Review, BackgroundJob,
+    add_missing_columns, migrate_chunk_embeddings
+)
 from .schemas import (
     ContentSourceCreate, ContentSourceResponse, 
     GeneratedContentCreate, GeneratedContentResponse,
-    ContentGenerationRequest, ReviewRequest, ReviewResponse
+    ContentGenerationRequest, ReviewRequest, ReviewResponse,
+    SemanticSearchResponse, BatchSemanticSearchRequest, BatchSemanticSearchResponse
 )
 from .services import (
-    ContentService, EmbeddingService, GenerationService, 
-    ReviewService, SchedulingService
+    ContentService, EmbeddingService, VectorService, GenerationService, 
+    ReviewService, SchedulingService, get_embedding_service, get_embedding_batcher,
+    attach_chunk_text, RetrievalService, get_search_cache, get_generation_cache,
+    get_semantic_cache
 )
-try:
-    from .workers import task_queue
-except ImportError:
-    # Fallback for when workers module is not available
-    task_queue = None
+from .lexical import ensure_lexical_index
+from .cache import generation_cache_key, normalize_text
+from .llm import (
+    get_http_session, close_http_session, openai_chat_completion, ProviderRouter, get_circuit_breaker
+)
+from .storage import (
+    UPLOAD_DIR, UploadTooLarge, UploadSizeLimitMiddleware, save_upload, find_stored_blob, discard_upload,
+    get_dedup_stats
+)
+from .workers import tasks, CONTENT_QUEUE, EMBEDDING_QUEUE, GENERATION_QUEUE
+from .workers import task_queue as redis_task_queue
+from .workers import embedding_queue as redis_embedding_queue
+from .workers import generation_queue as redis_generation_queue
+from .jobs import (
+    FallbackQueue, recover_jobs, shutdown_local_queues, job_to_dict, wait_for_job_update, TERMINAL_STATES
+)
+# Jobs run in-process whenever redis/rq are missing or Redis is unreachable
+task_queue = FallbackQueue(redis_task_queue, CONTENT_QUEUE)
+embedding_queue = FallbackQueue(redis_embedding_queue, EMBEDDING_QUEUE)
+generation_queue = FallbackQueue(redis_generation_queue, GENERATION_QUEUE)
 try:
     from .auth import get_current_user, create_access_token
 except ImportError:
@@ -62,6 +88,55 @@ async def startup_event():
         print("✅ Database tables created on startup")
     except Exception as e:
         print(f"❌ Failed to create database tables on startup: {e}")
+    
+    try:
+        added = add_missing_columns(engine)
+        if added:
+            print(f"✅ Added missing columns: {', '.join(added)}")
+    except Exception as e:
+        print(f"❌ Failed to add missing columns: {e}")
+    
+    try:
+        ensure_lexical_index(engine)
+    except Exception as e:
+        print(f"❌ Failed to create lexical index: {e}")
+    
+    try:
+        migrated = migrate_chunk_embeddings(engine)
+        if migrated["converted"]:
+            print(f"✅ Converted {migrated['converted']} chunk embeddings to float32 blobs")
+        if migrated["skipped"]:
+            print(f"⚠️ Cleared {migrated['skipped']} unusable legacy chunk embeddings")
+    except Exception as e:
+        print(f"❌ Failed to migrate chunk embeddings: {e}")
+    
+    # Pooled HTTP client for LLM providers, shared by every request
+    get_http_session()
+    
+    try:
+        recovered = recover_jobs()
+        if recovered:
+            print(f"✅ Resubmitted {recovered} unfinished in-process jobs")
+    except Exception as e:
+        print(f"❌ Failed to recover in-process jobs: {e}")
+    
+    if settings.EMBEDDING_WARMUP:
+        try:
+            embedding_service = get_embedding_service()
+            await asyncio.to_thread(embedding_service.warm_up)
+            print(f"✅ Embedding model loaded in {embedding_service.load_time:.2f}s")
+        except Exception as e:
+            print(f"❌ Failed to warm up embedding model: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers"""
+    await get_embedding_batcher().stop()
+    shutdown_local_queues()
+    await close_http_session()
+
+# Refuse oversized uploads before the multipart body is spooled to disk
+app.add_middleware(UploadSizeLimitMiddleware, max_size=settings.MAX_FILE_SIZE)
 
 # CORS middleware
 app.add_middleware(
@@ -113,73 +188,42 @@ async def test_endpoint():
 # AI Status Check endpoint
 @app.get("/ai/status")
 async def ai_status():
-    """Check if AI is properly configured"""
-    try:
-        import openai
-        from .config import settings
-        
-        has_api_key = bool(settings.OPENAI_API_KEY and settings.OPENAI_API_KEY != "demo-key")
-        
-        if has_api_key:
-            try:
-                # Test OpenAI API with direct HTTP request
-                import requests
-                
-                headers = {
-                    "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-                    "Content-Type": "application/json"
-                }
-                
-                # Test with a simple request
-                test_payload = {
-                    "model": "gpt-3.5-turbo",
-                    "messages": [{"role": "user", "content": "Hello"}],
-                    "max_tokens": 5
-                }
-                
-                response = requests.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers=headers,
-                    json=test_payload,
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    return {
-                        "status": "ai_ready",
-                        "message": "AI is properly configured and ready (HTTP API)",
-                        "has_api_key": True,
-                        "model": settings.LLM_MODEL,
-                        "method": "http_api"
-                    }
-                else:
-                    return {
-                        "status": "ai_error",
-                        "message": f"OpenAI API test failed: {response.status_code}",
-                        "has_api_key": True,
-                        "error": response.text
-                    }
-            except Exception as e:
-                return {
-                    "status": "ai_error", 
-                    "message": f"AI configured but connection failed: {str(e)}",
-                    "has_api_key": True,
-                    "error": str(e)
-                }
-        else:
-            return {
-                "status": "template_mode",
-                "message": "Running in template mode - no OpenAI API key provided",
-                "has_api_key": False,
-                "fallback": "Enhanced templates"
-            }
-    except ImportError:
+    """Check if AI is properly configured, from provider circuit breaker state.
+    
+    No provider is called: breakers are fed by real traffic, and an open
+    breaker lets one probe request through after its cooldown.
+    """
+    has_api_key = bool(settings.OPENAI_API_KEY and settings.OPENAI_API_KEY != "demo-key")
+    router_stats = provider_router.get_stats()
+    providers = {name: stats["breaker"] for name, stats in router_stats["providers"].items()}
+    providers["llm_service"] = get_circuit_breaker("llm_service").get_stats()
+    
+    if not has_api_key:
         return {
-            "status": "ai_unavailable",
-            "message": "OpenAI library not available",
+            "status": "template_mode",
+            "message": "Running in template mode - no OpenAI API key provided",
             "has_api_key": False,
-            "fallback": "Enhanced templates"
+            "fallback": "Enhanced templates",
+            "providers": providers
+        }
+    
+    openai_state = providers["openai"]["state"]
+    if openai_state == "open":
+        return {
+            "status": "ai_error",
+            "message": "OpenAI circuit open after recent failures",
+            "has_api_key": True,
+            "model": settings.LLM_MODEL,
+            "providers": providers
         }
+    return {
+        "status": "ai_ready",
+        "message": "AI is properly configured" + (" (recovering)" if openai_state == "half_open" else ""),
+        "has_api_key": True,
+        "model": settings.LLM_MODEL,
+        "method": "http_api",
+        "providers": providers
+    }
 
 # Database status endpoint
 @app.get("/admin/db-status")
@@ -203,6 +247,14 @@ async def database_status():
             "message": f"Failed to check database status: {str(e)}"
         }
 
+# Embedding model status endpoint
+@app.get("/admin/embedding-status")
+async def embedding_status():
+    """Report load time, memory use and batching metrics of the embedding model"""
+    stats = get_embedding_service().get_stats()
+    stats["batching"] = get_embedding_batcher().get_stats()
+    return stats
+
 # Database initialization endpoint
 @app.post("/admin/init-db")
 async def initialize_database():
@@ -228,6 +280,67 @@ async def initialize_database():
             "message": f"Failed to create database tables: {str(e)}"
         }
 
+# Search result cache status endpoint
+@app.get("/admin/search-cache")
+async def search_cache_status():
+    """Report hit/miss metrics of the vector search result cache"""
+    return get_search_cache().get_stats()
+
+# Embedding storage migration endpoint
+@app.get("/admin/generation-cache")
+async def generation_cache_status():
+    """Hit rate and size of the LLM response cache"""
+    cache = get_generation_cache()
+    stats = cache.get_stats() if cache is not None else {"backend": "none"}
+    semantic_cache = get_semantic_cache()
+    stats["semantic"] = semantic_cache.get_stats() if semantic_cache is not None else {"enabled": False}
+    return stats
+
+@app.get("/admin/llm-providers")
+async def llm_provider_stats():
+    """Per-provider latency percentiles, wins and hedged requests for /ai/generate"""
+    return provider_router.get_stats()
+
+@app.get("/admin/dedup-stats")
+async def dedup_stats(db: Session = Depends(get_db)):
+    """Storage and embedding work saved by deduplicating identical uploads"""
+    return get_dedup_stats(db)
+
+@app.post("/admin/migrate-embeddings")
+async def migrate_embeddings():
+    """Convert legacy JSON chunk embeddings to binary float32 vectors"""
+    try:
+        migrated = await asyncio.to_thread(migrate_chunk_embeddings, engine)
+        return {
+            "status": "success",
+            "converted": migrated["converted"],
+            "skipped": migrated["skipped"]
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Failed to migrate embeddings: {str(e)}"
+        }
+
+# Vector search quality report
+@app.get("/admin/vector-recall")
+async def vector_recall_report(sample_size: int = 100, k: int = 10, db: Session = Depends(get_db)):
+    """Compare recall@k and latency of the configured search path with exact search"""
+    from sqlalchemy import func
+    from .vector_store import get_vector_backend, measure_recall
+    
+    sample = db.query(ContentChunk.embedding).filter(
+        ContentChunk.embedding.isnot(None)
+    ).order_by(func.random()).limit(sample_size).all()
+    if not sample:
+        return {"status": "error", "message": "No stored chunk embeddings to sample queries from"}
+    
+    queries = np.vstack([row[0] for row in sample])
+    report = await asyncio.to_thread(measure_recall, get_vector_backend(), queries, k)
+    report["status"] = "success"
+    report["quantization"] = settings.VECTOR_QUANTIZATION
+    return report
+
 # Demo content generation (no auth, no DB required)
 @app.post("/demo/generate")
 async def demo_generate_content(request: dict):
@@ -272,156 +385,140 @@ async def ai_generate_content(request: dict):
     content_type = request.get("type", "linkedin_post")
     target_audience = request.get("audience", "general")
     tone = request.get("tone", "professional")
+    bypass_cache = bool(request.get("bypass_cache", False))
     
     if not source_text:
         return {"error": "Text is required"}
     
-    try:
-        # Try to use free AI alternatives first
-        print("🆓 Trying FREE AI alternatives...")
-        
+    # A near-duplicate of an earlier request gets that request's result
+    semantic_cache = request_embedding = None
+    request_text = semantic_cache_text(source_text, target_audience, tone)
+    if settings.SEMANTIC_CACHE_ENABLED:
         try:
-            # Option 1: Try Hugging Face Inference API (Free)
-            print("🤗 Trying Hugging Face AI...")
-            generated = await try_huggingface_ai(source_text, content_type, target_audience, tone)
-            if generated:
-                print("✅ Hugging Face AI SUCCESS!")
-                return {
-                    "status": "success",
-                    "generated_content": generated,
-                    "source_preview": source_text[:100] + "..." if len(source_text) > 100 else source_text,
-                    "ai_powered": True,
-                    "ai_source": "huggingface_free"
-                }
-            else:
-                print("❌ Hugging Face AI returned None")
+            request_embedding = await get_embedding_batcher().embed(request_text)
+            semantic_cache = get_semantic_cache()
         except Exception as e:
-            print(f"❌ Hugging Face AI failed: {e}")
-        
-        try:
-            # Option 2: Try Alternative Free AI
-            print("🔄 Trying Alternative Free AI...")
-            generated = await try_cohere_ai(source_text, content_type, target_audience, tone)
-            if generated:
-                print("✅ Alternative Free AI SUCCESS!")
+            print(f"⚠️ Semantic cache skipped, could not embed request: {e}")
+    if semantic_cache is not None:
+        if bypass_cache:
+            semantic_cache.record_bypass()
+        else:
+            cached = semantic_cache.get(request_embedding, scope=content_type, text=request_text)
+            if cached is not None:
+                (ai_source, generated), similarity = cached
                 return {
                     "status": "success",
-                    "generated_content": generated,
+                    "generated_content": copy.deepcopy(generated),
                     "source_preview": source_text[:100] + "..." if len(source_text) > 100 else source_text,
                     "ai_powered": True,
-                    "ai_source": "alternative_free"
-                }
-            else:
-                print("❌ Alternative Free AI returned None")
-        except Exception as e:
-            print(f"❌ Alternative Free AI failed: {e}")
-        
-        print("🔄 All FREE AI options failed, trying OpenAI...")
-        
-        # Option 2: Try OpenAI API (if available)
-        if settings.OPENAI_API_KEY and settings.OPENAI_API_KEY != "demo-key":
-            try:
-                import openai
-                import requests
-                
-                # Use direct HTTP requests to avoid client initialization issues
-                headers = {
-                    "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-                    "Content-Type": "application/json"
-                }
-                
-                # Create prompts based on content type
-                if content_type == "linkedin_post":
-                    system_prompt = f"""You are a professional content creator specializing in LinkedIn posts. 
-                    Create engaging LinkedIn content based on the source material.
-                    Target audience: {target_audience}
-                    Tone: {tone}
-                    
-                    Return a JSON response with:
-                    - title: Catchy headline
-                    - content: Full LinkedIn post (2-3 paragraphs)
-                    - hashtags: Array of relevant hashtags (5-8 hashtags)
-                    """
-                    user_prompt = f"Create a LinkedIn post from this content: {source_text}"
-                    
-                elif content_type == "twitter_thread":
-                    system_prompt = f"""You are a Twitter content creator. Create a Twitter thread (3-5 tweets) based on the source material.
-                    Target audience: {target_audience}
-                    Tone: {tone}
-                    
-                    Return a JSON response with:
-                    - thread: Array of tweets (numbered 1/, 2/, etc.)
-                    - hashtags: Array of relevant hashtags
-                    """
-                    user_prompt = f"Create a Twitter thread from this content: {source_text}"
-                    
-                else:
-                    system_prompt = f"""Create {content_type} content based on the source material.
-                    Target audience: {target_audience}
-                    Tone: {tone}
-                    """
-                    user_prompt = f"Create {content_type} content from: {source_text}"
-                
-                # Make direct HTTP request to OpenAI API
-                payload = {
-                    "model": settings.LLM_MODEL,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "temperature": settings.LLM_TEMPERATURE,
-                    "max_tokens": settings.LLM_MAX_TOKENS
+                    "ai_source": ai_source,
+                    "semantic_cache": {"hit": True, "similarity": round(similarity, 4)}
                 }
-                
-                response = requests.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    ai_response = response.json()
-                    ai_content = ai_response["choices"][0]["message"]["content"]
-                    
-                    # Try to parse JSON response
-                    try:
-                        import json
-                        generated = json.loads(ai_content)
-                        generated["ai_powered"] = True
-                    except:
-                        # If not JSON, wrap in structure
-                        generated = {
-                            "content": ai_content,
-                            "type": content_type,
-                            "ai_powered": True
-                        }
-                else:
-                    raise Exception(f"OpenAI API error: {response.status_code} - {response.text}")
-                    
-            except Exception as e:
-                # If OpenAI fails, use enhanced template
-                print(f"OpenAI API failed: {e}")
-                generated = create_enhanced_template(source_text, content_type, target_audience, tone)
-                generated["ai_fallback"] = f"OpenAI failed: {str(e)}"
-        else:
-            # No API key, use enhanced template
-            generated = create_enhanced_template(source_text, content_type, target_audience, tone)
-            
+    
+    # Providers race in priority order; a slow one is hedged with the next
+    try:
+        ai_source, generated = await provider_router.generate(
+            source_text, content_type, target_audience, tone, bypass_cache=bypass_cache
+        )
+        print(f"✅ {ai_source} AI SUCCESS!")
+        if semantic_cache is not None:
+            semantic_cache.set(
+                request_embedding, content_type, (ai_source, copy.deepcopy(generated)), text=request_text
+            )
     except Exception as e:
-        return {
-            "error": f"AI generation failed: {str(e)}",
-            "fallback": create_enhanced_template(source_text, content_type, target_audience, tone)
-        }
+        print(f"❌ All AI providers failed: {e}")
+        generated = create_enhanced_template(source_text, content_type, target_audience, tone)
+        generated["ai_fallback"] = str(e)
+        ai_source = "template"
     
     return {
         "status": "success",
         "generated_content": generated,
         "source_preview": source_text[:100] + "..." if len(source_text) > 100 else source_text,
-        "ai_powered": True
+        "ai_powered": True,
+        "ai_source": ai_source
     }
 
-async def try_cohere_ai(source_text: str, content_type: str, audience: str, tone: str):
+def semantic_cache_text(source_text: str, audience: str, tone: str) -> str:
+    """Normalized request text embedded for the semantic cache"""
+    return normalize_text(f"audience: {audience}\ntone: {tone}\n{source_text}").lower()
+
+async def try_openai_ai(source_text: str, content_type: str, audience: str, tone: str,
+                        bypass_cache: bool = False):
+    """Generate with the OpenAI chat API; None without an API key.
+    
+    Responses are cached by prompt and parameters unless bypass_cache is set.
+    """
+    if not settings.OPENAI_API_KEY or settings.OPENAI_API_KEY == "demo-key":
+        return None
+    
+    # Create prompts based on content type
+    if content_type == "linkedin_post":
+        system_prompt = f"""You are a professional content creator specializing in LinkedIn posts. 
+        Create engaging LinkedIn content based on the source material.
+        Target audience: {audience}
+        Tone: {tone}
+        
+        Return a JSON response with:
+        - title: Catchy headline
+        - content: Full LinkedIn post (2-3 paragraphs)
+        - hashtags: Array of relevant hashtags (5-8 hashtags)
+        """
+        user_prompt = f"Create a LinkedIn post from this content: {source_text}"
+        
+    elif content_type == "twitter_thread":
+        system_prompt = f"""You are a Twitter content creator. Create a Twitter thread (3-5 tweets) based on the source material.
+        Target audience: {audience}
+        Tone: {tone}
+        
+        Return a JSON response with:
+        - thread: Array of tweets (numbered 1/, 2/, etc.)
+        - hashtags: Array of relevant hashtags
+        """
+        user_prompt = f"Create a Twitter thread from this content: {source_text}"
+        
+    else:
+        system_prompt = f"""Create {content_type} content based on the source material.
+        Target audience: {audience}
+        Tone: {tone}
+        """
+        user_prompt = f"Create {content_type} content from: {source_text}"
+    
+    cache = get_generation_cache()
+    cache_key = generation_cache_key(
+        settings.LLM_MODEL, system_prompt, user_prompt, [], settings.LLM_TEMPERATURE, settings.LLM_MAX_TOKENS
+    )
+    ai_content = None
+    if cache is not None:
+        if bypass_cache:
+            cache.record_bypass()
+        else:
+            ai_content = await cache.get(cache_key)
+    
+    if ai_content is None:
+        # Request on the pooled async client, so the event loop keeps serving
+        ai_content = await openai_chat_completion([
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ])
+        if cache is not None:
+            await cache.set(cache_key, ai_content)
+    
+    # Try to parse JSON response
+    try:
+        generated = json.loads(ai_content)
+        generated["ai_powered"] = True
+    except:
+        # If not JSON, wrap in structure
+        generated = {
+            "content": ai_content,
+            "type": content_type,
+            "ai_powered": True
+        }
+    return generated
+
+async def try_cohere_ai(source_text: str, content_type: str, audience: str, tone: str,
+                        bypass_cache: bool = False):
     """Try alternative free AI approach"""
     try:
         print(f"🔄 Processing with Alternative AI: {content_type}")
@@ -482,7 +579,8 @@ Have you noticed these {topic} trends in your industry? Share your observations
         print(f"Alternative AI processing error: {e}")
         return None
 
-async def try_huggingface_ai(source_text: str, content_type: str, audience: str, tone: str):
+async def try_huggingface_ai(source_text: str, content_type: str, audience: str, tone: str,
+                             bypass_cache: bool = False):
     """Try free AI - using enhanced template that looks like AI"""
     try:
         print(f"🤗 Processing with AI: {content_type} for {audience}")
@@ -580,6 +678,12 @@ What's your perspective on {main_topic}? Let's discuss in the comments!
         print(f"Free AI processing error: {e}")
         return None
 
+# Provider priority for /ai/generate; OpenAI only takes part with an API key
+provider_router = ProviderRouter([
+    ("huggingface_free", try_huggingface_ai),
+    ("alternative_free", try_cohere_ai)
+] + ([("openai", try_openai_ai)] if settings.OPENAI_API_KEY and settings.OPENAI_API_KEY != "demo-key" else []))
+
 def create_enhanced_template(source_text: str, content_type: str, audience: str, tone: str):
     """Create enhanced template-based content"""
     
@@ -650,16 +754,25 @@ async def upload_content(
     if file.content_type not in allowed_types:
         raise HTTPException(status_code=400, detail="Unsupported file type")
     
-    # Create uploads directory if it doesn't exist
-    os.makedirs("uploads", exist_ok=True)
-    
-    # Save uploaded file
+    # Stream uploaded file to disk, hashing it on the way
     file_id = str(uuid.uuid4())
-    file_path = f"uploads/{file_id}_{file.filename}"
+    file_path = f"{UPLOAD_DIR}/{file_id}_{file.filename}"
+    try:
+        file_size, file_hash = await save_upload(file, file_path, settings.MAX_FILE_SIZE)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
-    content = await file.read()
-    with open(file_path, "wb") as buffer:
-        buffer.write(content)
+    # Identical files share the first stored copy; processing reuses its chunks
+    metadata = {}
+    if settings.DEDUP_UPLOADS:
+        try:
+            original = find_stored_blob(db, file_hash)
+            if original is not None:
+                await discard_upload(file_path)
+                file_path = original.file_path
+                metadata["dedup"] = {"duplicate_of": original.id, "bytes_saved": file_size}
+        except Exception as e:
+            print(f"Deduplication lookup failed (keeping upload): {e}")
     
     # Create content source record
     content_source = ContentSource(
@@ -668,8 +781,10 @@ async def upload_content(
         description=description,
         source_type=source_type,
         file_path=file_path,
-        file_size=len(content),
+        file_size=file_size,
+        content_hash=file_hash,
         status="uploaded",
+        content_metadata=metadata,
         user_id=current_user.get("user_id", "demo_user")
     )
     
@@ -686,14 +801,14 @@ async def upload_content(
         content_source.content_metadata = {}
         print(f"Database error (continuing without DB): {e}")
     
-    # Queue processing job (if task_queue is available)
+    # Queue processing job
+    job_id = str(uuid.uuid4())
     try:
-        if task_queue and source_type in ["audio", "video"]:
-            task_queue.enqueue("process_audio", file_id, file_path)
-        elif task_queue:
-            task_queue.enqueue("process_text", file_id, file_path)
-        else:
-            print("Task queue not available - skipping job queue")
+        job_func = tasks.process_audio if source_type in ["audio", "video"] else tasks.process_text
+        embedding_queue.enqueue(
+            job_func, file_id, file_path, job_id=job_id,
+            job_timeout=settings.EMBEDDING_JOB_TIMEOUT, owner_id=content_source.user_id
+        )
     except Exception as e:
         print(f"Task queue error (continuing without queue): {e}")
     
@@ -708,10 +823,55 @@ async def upload_content(
         "status": content_source.status,
         "transcript": content_source.transcript,
         "metadata": content_source.content_metadata or {},
+        "job_id": job_id,
         "created_at": content_source.created_at or datetime.utcnow(),
         "updated_at": content_source.updated_at or datetime.utcnow()
     }
 
+@app.post("/content/sources/{source_id}/reprocess")
+async def reprocess_content(
+    source_id: str,
+    file: Optional[UploadFile] = File(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Re-ingest an edited version of a text source, re-embedding only changed chunks"""
+    source = db.query(ContentSource).filter(
+        ContentSource.id == source_id,
+        ContentSource.user_id == current_user.get("user_id", "demo_user")
+    ).first()
+    
+    if not source:
+        raise HTTPException(status_code=404, detail="Content source not found")
+    
+    if source.source_type in ["audio", "video"]:
+        raise HTTPException(status_code=400, detail="Only text sources can be re-processed incrementally")
+    
+    file_path = source.file_path
+    if file is not None:
+        file_path = f"{UPLOAD_DIR}/{uuid.uuid4()}_{file.filename}"
+        try:
+            await save_upload(file, file_path, settings.MAX_FILE_SIZE)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+    
+    job_id = str(uuid.uuid4())
+    try:
+        embedding_queue.enqueue(
+            tasks.reprocess_text, source_id, file_path, job_id=job_id,
+            job_timeout=settings.EMBEDDING_JOB_TIMEOUT, owner_id=source.user_id
+        )
+    except Exception as e:
+        print(f"Task queue error (continuing without queue): {e}")
+    
+    return {
+        "id": source_id,
+        "file_path": file_path,
+        "job_id": job_id,
+        "status": "queued",
+        "message": "Incremental re-processing started"
+    }
+
 @app.get("/content/sources")
 async def list_content_sources(
     skip: int = 0,
@@ -819,12 +979,17 @@ async def generate_content(
     
     # Queue generation job
     job_id = str(uuid.uuid4())
-    task_queue.enqueue(
-        "generate_content",
+    generation_queue.enqueue(
+        tasks.generate_content,
         job_id,
         request.source_id,
         request.content_types,
-        request.custom_prompts
+        request.custom_prompts,
+        current_user.get("user_id", "demo_user"),
+        request.bypass_cache,
+        job_id=job_id,
+        job_timeout=settings.GENERATION_JOB_TIMEOUT,
+        owner_id=source.user_id
     )
     
     return {
@@ -833,28 +998,124 @@ async def generate_content(
         "message": "Content generation started"
     }
 
+JOB_POLL_INTERVAL = 1.0  # Seconds between re-reads of jobs updated by other processes
+JOB_MAX_WAIT = 30.0
+JOB_SSE_HEARTBEAT = 15.0
+
+def get_job_status(db: Session, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    """Job row plus generated content once available; None if unknown to this user"""
+    job = db.query(BackgroundJob).filter(BackgroundJob.id == job_id).first()
+    if job is not None and job.user_id and job.user_id != user_id:
+        job = None
+    
+    generated_content = db.query(GeneratedContent).filter(
+        GeneratedContent.job_id == job_id
+    ).first()
+    if job is None and generated_content is None:
+        return None
+    
+    status = job_to_dict(job) if job is not None else {"job_id": job_id, "progress": 1.0}
+    if generated_content is not None:
+        content = generated_content.content
+        if isinstance(content, str):
+            content = json.loads(content)
+        # Review state of the content once the job has produced it
+        status["status"] = generated_content.status
+        status["content"] = content
+        status["created_at"] = generated_content.created_at.isoformat()
+    return status
+
+def job_is_done(status: Dict[str, Any]) -> bool:
+    return status["status"] in TERMINAL_STATES or "content" in status
+
 @app.get("/content/generated/{job_id}")
 async def get_generation_status(
     job_id: str,
+    wait: float = 0.0,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get status of content generation job"""
-    
-    # Check if job exists in database
-    generated_content = db.query(GeneratedContent).filter(
-        GeneratedContent.job_id == job_id
-    ).first()
+    """Get status of a content generation (or any queued) job.
     
-    if not generated_content:
+    With wait > 0 this long-polls: the response is held for up to `wait`
+    seconds (max 30) until the job's status or progress changes.
+    """
+    user_id = current_user.get("user_id", "demo_user")
+    status = get_job_status(db, job_id, user_id)
+    if status is None:
         return {"status": "not_found", "message": "Job not found"}
     
-    return {
-        "job_id": job_id,
-        "status": generated_content.status,
-        "content": json.loads(generated_content.content) if generated_content.content else None,
-        "created_at": generated_content.created_at.isoformat()
-    }
+    deadline = time.monotonic() + min(max(wait, 0.0), JOB_MAX_WAIT)
+    seen = (status["status"], status["progress"])
+    while not job_is_done(status) and time.monotonic() < deadline:
+        await wait_for_job_update(job_id, min(JOB_POLL_INTERVAL, deadline - time.monotonic()))
+        db.expire_all()
+        # Off the event loop; the session is only ever used by one thread at a time
+        latest = await asyncio.to_thread(get_job_status, db, job_id, user_id)
+        if latest is None:
+            break
+        status = latest
+        if (status["status"], status["progress"]) != seen:
+            break
+    return status
+
+@app.get("/content/generated/{job_id}/events")
+async def stream_generation_status(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Server-sent events with the job status on every change, until it finishes"""
+    user_id = current_user.get("user_id", "demo_user")
+    
+    def read_status():
+        db = SessionLocal()
+        try:
+            return get_job_status(db, job_id, user_id)
+        finally:
+            db.close()
+    
+    # Reads run on a worker thread so open streams never block the event loop
+    if await asyncio.to_thread(read_status) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def events():
+        seen = None
+        last_sent = time.monotonic()
+        while True:
+            status = await asyncio.to_thread(read_status)
+            if status is None:
+                return
+            state = (status["status"], status["progress"])
+            if state != seen:
+                seen = state
+                last_sent = time.monotonic()
+                yield f"event: status\ndata: {json.dumps(status, default=str)}\n\n"
+            elif time.monotonic() - last_sent >= JOB_SSE_HEARTBEAT:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            if job_is_done(status):
+                return
+            await wait_for_job_update(job_id, JOB_POLL_INTERVAL)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/jobs")
+async def list_jobs(
+    status: Optional[str] = None,
+    limit: int = 20,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Most recent jobs of the current user"""
+    query = db.query(BackgroundJob).filter(BackgroundJob.user_id == current_user.get("user_id", "demo_user"))
+    if status:
+        query = query.filter(BackgroundJob.status == status)
+    jobs = query.order_by(BackgroundJob.created_at.desc()).limit(min(limit, 100)).all()
+    return {"jobs": [job_to_dict(job) for job in jobs], "total": len(jobs)}
 
 # Review and approval endpoints
 @app.post("/content/review", response_model=ReviewResponse)
@@ -973,33 +1234,113 @@ async def get_analytics_overview(
     }
 
 # Vector search endpoints
-@app.post("/search/semantic")
+@app.post("/search/semantic", response_model=SemanticSearchResponse)
 async def semantic_search(
     query: str,
     source_id: Optional[str] = None,
     limit: int = 10,
+    similarity_threshold: float = 0.7,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Perform semantic search across content"""
+    started = time.perf_counter()
     
-    # Get embedding for query
-    embedding_service = EmbeddingService()
-    query_embedding = embedding_service.get_embedding(query)
+    # Get embedding for query, batched with concurrent searches
+    query_embedding = await get_embedding_batcher().embed(query)
     
     # Search in vector database
-    from .services import VectorService
     vector_service = VectorService()
-    results = vector_service.search(
+    results = await asyncio.to_thread(
+        vector_service.search,
         query_embedding,
         source_id=source_id,
-        limit=limit
+        limit=limit,
+        score_threshold=similarity_threshold
+    )
+    attach_chunk_text(db, results)
+    
+    return {
+        "query": query,
+        "results": results,
+        "total": len(results),
+        "search_time": time.perf_counter() - started,
+        "similarity_threshold": similarity_threshold
+    }
+
+@app.post("/search/hybrid", response_model=SemanticSearchResponse)
+async def hybrid_search(
+    query: str,
+    source_id: Optional[str] = None,
+    limit: int = 10,
+    similarity_threshold: float = 0.7,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Keyword (BM25) and semantic search fused by reciprocal rank"""
+    started = time.perf_counter()
+    query_embedding = await get_embedding_batcher().embed(query)
+    results = await asyncio.to_thread(
+        RetrievalService(db).hybrid_search,
+        query,
+        source_id=source_id,
+        limit=limit,
+        score_threshold=similarity_threshold,
+        query_embedding=query_embedding
     )
     
     return {
         "query": query,
         "results": results,
-        "total": len(results)
+        "total": len(results),
+        "search_time": time.perf_counter() - started,
+        "similarity_threshold": similarity_threshold
+    }
+
+@app.post("/search/semantic/batch", response_model=BatchSemanticSearchResponse)
+async def batch_semantic_search(
+    request: BatchSemanticSearchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Run several semantic searches with one embedding batch and one vector lookup"""
+    started = time.perf_counter()
+    queries = request.queries
+    
+    query_embeddings = await asyncio.to_thread(
+        get_embedding_service().get_embeddings_batch, [q.query for q in queries]
+    )
+    embed_time = time.perf_counter() - started
+    
+    lookup_started = time.perf_counter()
+    vector_service = VectorService()
+    batch_results = await asyncio.to_thread(
+        vector_service.search_batch,
+        query_embeddings,
+        [q.source_id for q in queries],
+        [q.limit for q in queries],
+        [q.similarity_threshold for q in queries]
+    )
+    lookup_time = time.perf_counter() - lookup_started
+    
+    attach_chunk_text(db, [result for results in batch_results for result in results])
+    
+    # Queries share one embedding batch and one vector lookup, so each reports
+    # its even share of both; total_time carries the wall time of the batch
+    per_query_time = (embed_time + lookup_time) / len(queries)
+    return {
+        "results": [
+            {
+                "query": q.query,
+                "results": results,
+                "total": len(results),
+                "search_time": per_query_time,
+                "similarity_threshold": q.similarity_threshold
+            }
+            for q, results in zip(queries, batch_results)
+        ],
+        "total": len(queries),
+        "total_time": time.perf_counter() - started
     }
 
 if __name__ == "__main__":
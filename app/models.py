@@ -1,13 +1,42 @@
-from sqlalchemy import Column, String, Text, DateTime, Integer, Boolean, JSON, ForeignKey, Float
+from sqlalchemy import Column, String, Text, DateTime, Integer, Boolean, JSON, ForeignKey, Float, LargeBinary, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
+import json
+import math
 import uuid
+from typing import Dict, List, Optional
 from datetime import datetime
 import os
 
+from .vectors import encode_vector, decode_vector
+
 # Use String for UUID in all cases to avoid SQLite issues
 UUID_TYPE = String(36)
 
+class VectorType(TypeDecorator):
+    """Stores an embedding as a compact binary blob and loads it as an ndarray.
+    
+    quantization="float32" keeps full precision (4 bytes per dimension);
+    "int8" stores one byte per dimension plus a scale.
+    """
+    impl = LargeBinary
+    cache_ok = True
+    
+    def __init__(self, quantization: str = "float32", *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.quantization = quantization
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return encode_vector(value, self.quantization)
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decode_vector(value, self.quantization)
+
 Base = declarative_base()
 
 class User(Base):
@@ -33,6 +62,7 @@ class ContentSource(Base):
     source_type = Column(String(50), nullable=False)  # text, audio, video, pdf
     file_path = Column(String(500), nullable=False)
     file_size = Column(Integer)
+    content_hash = Column(String(64), index=True)  # sha256 of the uploaded file, used for deduplication
     status = Column(String(50), default="uploaded")  # uploaded, processing, processed, failed
     transcript = Column(Text)  # For audio/video content
     content_metadata = Column(JSON)  # Additional metadata
@@ -57,7 +87,8 @@ class ContentChunk(Base):
     start_time = Column(Float)  # For audio/video, start time in seconds
     end_time = Column(Float)
     token_count = Column(Integer)
-    embedding = Column(JSON)  # Vector embedding
+    content_hash = Column(String(64), index=True)  # sha256 of the normalized chunk text
+    embedding = Column(VectorType())  # Little-endian float32 vector embedding
     chunk_metadata = Column(JSON)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -128,3 +159,103 @@ class ContentMetrics(Base):
     
     # Relationships
     content = relationship("GeneratedContent")
+
+class BackgroundJob(Base):
+    """State, progress and timings of a queued job, whichever backend runs it.
+    
+    Rows of in-process jobs also hold what is needed to run them again
+    after a restart.
+    """
+    __tablename__ = "background_jobs"
+    
+    id = Column(String(100), primary_key=True)  # Same id as the RQ job
+    queue = Column(String(50), nullable=False)
+    backend = Column(String(20), default="local")  # local, rq
+    func_name = Column(String(255), nullable=False)  # Dotted import path of the job function
+    args = Column(JSON)
+    kwargs = Column(JSON)
+    user_id = Column(UUID_TYPE, index=True)
+    status = Column(String(50), default="queued", index=True)  # queued, started, finished, failed
+    progress = Column(Float, default=0.0)  # 0.0 - 1.0
+    message = Column(String(255))
+    result = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    ended_at = Column(DateTime)
+
+def add_missing_columns(engine) -> List[str]:
+    """Add columns defined on the models but missing from existing tables.
+    
+    create_all only creates missing tables; this covers columns added to
+    models later. Returns the "table.column" names that were added.
+    """
+    from sqlalchemy import inspect
+    from sqlalchemy.schema import CreateIndex
+    
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                added.append(f"{table.name}.{column.name}")
+                for index in table.indexes:
+                    if column in index.columns.values():
+                        conn.execute(CreateIndex(index, if_not_exists=True))
+    return added
+
+def _legacy_vector(raw) -> Optional[list]:
+    """A legacy JSON embedding as a list of finite numbers, or None if unusable"""
+    try:
+        vector = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+    except ValueError:
+        return None
+    if not isinstance(vector, list) or not vector:
+        return None
+    if not all(isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+               for value in vector):
+        return None
+    return vector
+
+def migrate_chunk_embeddings(engine, batch_size: int = 1000) -> Dict[str, int]:
+    """Rewrite legacy JSON-encoded chunk embeddings as float32 blobs.
+    
+    Only non-blob rows are read, in id order, batch_size at a time; each
+    batch is converted and committed before the next is read. Values that
+    are not a non-empty list of numbers (JSON null, [], malformed text) are
+    set to NULL rather than stored as a corrupt vector. Returns the number
+    of rows converted and skipped. Safe to run repeatedly.
+    """
+    vector_type = ContentChunk.__table__.c.embedding.type
+    select_legacy = text(
+        "SELECT id, embedding FROM content_chunks "
+        "WHERE embedding IS NOT NULL AND typeof(embedding) != 'blob' AND id > :last_id "
+        "ORDER BY id LIMIT :limit"
+    )
+    converted = skipped = 0
+    last_id = ""
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(select_legacy, {"last_id": last_id, "limit": batch_size}).fetchall()
+            if not rows:
+                break
+            updates = []
+            for chunk_id, raw in rows:
+                vector = _legacy_vector(raw)
+                if vector is None:
+                    skipped += 1
+                    updates.append({"id": chunk_id, "embedding": None})
+                else:
+                    converted += 1
+                    updates.append({"id": chunk_id, "embedding": encode_vector(vector, vector_type.quantization)})
+            conn.execute(text("UPDATE content_chunks SET embedding = :embedding WHERE id = :id"), updates)
+        last_id = rows[-1][0]
+    return {"converted": converted, "skipped": skipped}
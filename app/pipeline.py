@@ -0,0 +1,121 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import queue
+import threading
+import time
+
+_DONE = object()
+
+class StageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.batches = 0
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.idle_seconds = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 4),
+            "idle_seconds": round(self.idle_seconds, 4),
+            "items_per_second": round(self.items / self.busy_seconds, 2) if self.busy_seconds else None
+        }
+
+class Pipeline:
+    """Runs batches through a chain of stages, one thread per stage.
+
+    Stages are connected by bounded queues, so a fast stage blocks once it is
+    queue_size batches ahead of the next one and total time approaches that
+    of the slowest stage. Each stage receives the previous stage's return
+    value; item counts use len(batch). If any stage raises, the remaining
+    input is drained and discarded and run() re-raises the first error.
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable[[Any], Any]]], queue_size: int = 2,
+                 source_name: str = "produce"):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.source_name = source_name
+        self.stats: Dict[str, StageStats] = {}
+        self._error: Optional[BaseException] = None
+        self._failed = threading.Event()
+
+    def run(self, batches: Iterable[Any]) -> Dict[str, Any]:
+        """Feed batches through every stage and return per-stage metrics"""
+        started = time.perf_counter()
+        self.stats = {name: StageStats(name) for name in [self.source_name] + [name for name, _ in self.stages]}
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = []
+        for index, (name, fn) in enumerate(self.stages):
+            output = queues[index + 1] if index + 1 < len(queues) else None
+            thread = threading.Thread(
+                target=self._run_stage, args=(name, fn, queues[index], output),
+                name=f"pipeline-{name}", daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+
+        self._produce(batches, queues[0])
+        for thread in threads:
+            thread.join()
+
+        if self._error is not None:
+            raise self._error
+        metrics = {name: stats.to_dict() for name, stats in self.stats.items()}
+        metrics["total_seconds"] = round(time.perf_counter() - started, 4)
+        return metrics
+
+    def _produce(self, batches: Iterable[Any], output: queue.Queue):
+        stats = self.stats[self.source_name]
+        iterator = iter(batches)
+        try:
+            while not self._failed.is_set():
+                busy_started = time.perf_counter()
+                try:
+                    batch = next(iterator)
+                except StopIteration:
+                    break
+                stats.busy_seconds += time.perf_counter() - busy_started
+                stats.batches += 1
+                stats.items += len(batch)
+                self._put(output, batch, stats)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            output.put(_DONE)
+
+    def _run_stage(self, name: str, fn: Callable[[Any], Any], inbox: queue.Queue,
+                   output: Optional[queue.Queue]):
+        stats = self.stats[name]
+        while True:
+            waited = time.perf_counter()
+            batch = inbox.get()
+            stats.idle_seconds += time.perf_counter() - waited
+            if batch is _DONE:
+                break
+            if self._failed.is_set():
+                continue  # Drain so upstream stages are not blocked on put()
+            busy_started = time.perf_counter()
+            try:
+                result = fn(batch)
+            except BaseException as e:
+                self._fail(e)
+                continue
+            stats.busy_seconds += time.perf_counter() - busy_started
+            stats.batches += 1
+            stats.items += len(batch)
+            if output is not None:
+                self._put(output, result, stats)
+        if output is not None:
+            output.put(_DONE)
+
+    def _put(self, output: queue.Queue, batch: Any, stats: StageStats):
+        waited = time.perf_counter()
+        output.put(batch)
+        stats.idle_seconds += time.perf_counter() - waited
+
+    def _fail(self, error: BaseException):
+        if self._error is None:
+            self._error = error
+        self._failed.set()
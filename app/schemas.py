@@ -40,6 +40,7 @@ class ContentGenerationRequest(BaseModel):
     target_audience: Optional[str] = None
     tone: Optional[str] = "professional"
     max_length: Optional[int] = None
+    bypass_cache: bool = False  # Regenerate instead of reusing cached LLM responses
 
 class GeneratedContentCreate(BaseModel):
     source_id: str
@@ -111,3 +112,11 @@ class SemanticSearchResponse(BaseModel):
     total: int
     search_time: float
     similarity_threshold: float
+
+class BatchSemanticSearchRequest(BaseModel):
+    queries: List[SemanticSearchRequest] = Field(..., min_length=1, max_length=100)
+
+class BatchSemanticSearchResponse(BaseModel):
+    results: List[SemanticSearchResponse]
+    total: int
+    total_time: float
@@ -1,205 +1,944 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Iterator, TextIO
 import asyncio
+import copy
+import inspect
+import itertools
 import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import numpy as np
 from datetime import datetime
 from sentence_transformers import SentenceTransformer
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
 import openai
+from sqlalchemy import bindparam
 from sqlalchemy.orm import Session
 from .models import ContentSource, ContentChunk, GeneratedContent
 from .config import settings
+from .cache import EmbeddingCache, SearchResultCache, GenerationCache, SemanticCache, generation_cache_key
+from .vectors import as_float32
+from .vector_store import VectorBackend, get_vector_backend
+from .lexical import LexicalIndex, reciprocal_rank_fusion
+from .chunking import TokenChunker, iter_sentences, sentence_anchor, content_hash
+from .pipeline import Pipeline
+from .storage import file_sha256
+from .llm import LLMError, post_json, get_circuit_breaker
 
 class EmbeddingService:
-    def __init__(self):
-        self.model = SentenceTransformer(settings.EMBEDDING_MODEL)
-        self.dimension = 384  # all-MiniLM-L6-v2 dimension
+    def __init__(self, model_name: Optional[str] = None):
+        self.model_name = model_name or settings.EMBEDDING_MODEL
+        self.dimension = settings.EMBEDDING_DIMENSION
+        self._model = None
+        self._token_counter = None
+        self._load_lock = threading.Lock()
+        # encode() is not thread-safe (the fast tokenizer is shared), and
+        # callers reach it from the batcher, the pipeline and job threads
+        self._encode_lock = threading.Lock()
+        self.load_time: Optional[float] = None
+        self.load_rss_delta_mb: Optional[float] = None
+        self.cache = EmbeddingCache(
+            self.model_name,
+            memory_size=settings.EMBEDDING_CACHE_SIZE,
+            disk_path=settings.EMBEDDING_CACHE_PATH,
+            disk_max_entries=settings.EMBEDDING_CACHE_DISK_MAX_ENTRIES
+        )
+    
+    @property
+    def model(self) -> SentenceTransformer:
+        """Load the model on first use; concurrent callers wait for one load"""
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    rss_before = _current_rss_mb()
+                    started = time.perf_counter()
+                    model = SentenceTransformer(self.model_name)
+                    self.load_time = time.perf_counter() - started
+                    rss_after = _current_rss_mb()
+                    if rss_before is not None and rss_after is not None:
+                        self.load_rss_delta_mb = rss_after - rss_before
+                    self.dimension = model.get_sentence_embedding_dimension() or self.dimension
+                    self._model = model
+        return self._model
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+    
+    @property
+    def max_tokens(self) -> int:
+        """Chunk token budget: MAX_CHUNK_SIZE capped by the model's sequence length"""
+        max_seq_length = getattr(self.model, "max_seq_length", None)
+        if max_seq_length:
+            # Leave room for the [CLS] and [SEP] tokens added at encode time
+            return min(settings.MAX_CHUNK_SIZE, max_seq_length - 2)
+        return settings.MAX_CHUNK_SIZE
+    
+    def count_tokens(self, text: str) -> int:
+        """Number of tokens the model's tokenizer produces for text"""
+        tokenizer = self._counting_tokenizer()
+        if tokenizer is None:
+            return len(text.split())
+        return len(tokenizer.encode(text, add_special_tokens=False))
     
-    def get_embedding(self, text: str) -> List[float]:
-        """Generate embedding for text"""
-        return self.model.encode(text).tolist()
+    def _counting_tokenizer(self):
+        # Fast tokenizers are not safe to share across threads, and chunking
+        # runs alongside encode() during ingestion, so count with a copy
+        if self._token_counter is None:
+            with self._load_lock:
+                if self._token_counter is None:
+                    tokenizer = getattr(self.model, "tokenizer", None)
+                    self._token_counter = copy.deepcopy(tokenizer) if tokenizer is not None else False
+        return self._token_counter or None
     
-    def get_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for multiple texts"""
-        return self.model.encode(texts).tolist()
+    def warm_up(self) -> None:
+        """Load the model and run one encode so the first request is not slow"""
+        model = self.model
+        with self._encode_lock:
+            model.encode("warm up")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Load-time and memory metrics for the shared model"""
+        return {
+            "model": self.model_name,
+            "loaded": self.is_loaded,
+            "dimension": self.dimension,
+            "load_time": self.load_time,
+            "load_rss_delta_mb": self.load_rss_delta_mb,
+            "process_rss_mb": _current_rss_mb(),
+            "cache": self.cache.get_stats()
+        }
+    
+    def get_embedding(self, text: str) -> np.ndarray:
+        """Generate a float32 embedding for text"""
+        return self.get_embeddings_batch([text])[0]
+    
+    def get_embeddings_batch(self, texts: List[str]) -> np.ndarray:
+        """Generate a (len(texts), dimension) float32 matrix, encoding only cache misses"""
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        vectors = self.cache.get_many(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            model = self.model
+            with self._encode_lock:
+                encoded = as_float32(model.encode(missing_texts))
+            self.cache.put_many(missing_texts, encoded)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+        return as_float32(np.vstack(vectors))
 
-class VectorService:
-    def __init__(self):
-        self.client = QdrantClient(url=settings.QDRANT_URL)
-        self.collection_name = "content_chunks"
-        self._ensure_collection()
+def _current_rss_mb() -> Optional[float]:
+    """Current resident set size of this process in MB, or None where it cannot be read"""
+    try:
+        # Second field is resident pages (Linux)
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except Exception:
+        return None
+
+_embedding_service: Optional[EmbeddingService] = None
+_embedding_service_lock = threading.Lock()
+
+def get_embedding_service() -> EmbeddingService:
+    """Return the process-wide EmbeddingService, creating it on first call"""
+    global _embedding_service
+    if _embedding_service is None:
+        with _embedding_service_lock:
+            if _embedding_service is None:
+                _embedding_service = EmbeddingService()
+    return _embedding_service
+
+def _percentile(values: List[float], percent: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of samples"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+class EmbeddingBatcher:
+    """Collects concurrent query texts and encodes them in one model batch.
     
-    def _ensure_collection(self):
-        """Ensure collection exists"""
-        try:
-            self.client.get_collection(self.collection_name)
-        except:
-            self.client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=VectorParams(
-                    size=384,  # all-MiniLM-L6-v2 dimension
-                    distance=Distance.COSINE
-                )
-            )
+    Callers await `embed`; a background task drains the queue, waiting at most
+    `max_wait_ms` after the first text (or until `max_batch_size` texts) before
+    running a single `encode` on a worker thread. The queue is bounded by
+    `max_pending`, so callers wait when the encoder falls behind.
+    """
     
-    def add_chunks(self, chunks: List[ContentChunk], embeddings: List[List[float]]):
-        """Add content chunks to vector database"""
-        points = []
-        for chunk, embedding in zip(chunks, embeddings):
-            points.append(PointStruct(
-                id=str(chunk.id),
-                vector=embedding,
-                payload={
-                    "source_id": str(chunk.source_id),
-                    "chunk_text": chunk.chunk_text,
-                    "chunk_index": chunk.chunk_index,
-                    "start_position": chunk.start_position,
-                    "end_position": chunk.end_position,
-                    "start_time": chunk.start_time,
-                    "end_time": chunk.end_time,
-                    "token_count": chunk.token_count,
-                    "metadata": chunk.metadata or {}
-                }
-            ))
-        
-        self.client.upsert(
-            collection_name=self.collection_name,
-            points=points
-        )
+    def __init__(self, embedding_service: EmbeddingService, max_batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None, max_pending: Optional[int] = None):
+        self.embedding_service = embedding_service
+        self.max_batch_size = max_batch_size or settings.EMBEDDING_BATCH_MAX_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.EMBEDDING_BATCH_WINDOW_MS) / 1000
+        self.max_pending = max_pending or settings.EMBEDDING_BATCH_MAX_PENDING
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batch_sizes = deque(maxlen=1000)
+        self._latencies = deque(maxlen=1000)
+        self.total_requests = 0
+        self.total_batches = 0
     
-    def search(self, query_embedding: List[float], source_id: Optional[str] = None, 
-               limit: int = 10, score_threshold: float = 0.7) -> List[Dict[str, Any]]:
-        """Search for similar chunks"""
-        filter_conditions = None
-        if source_id:
-            filter_conditions = {
-                "must": [{"key": "source_id", "match": {"value": source_id}}]
-            }
+    async def embed(self, text: str) -> np.ndarray:
+        """Queue a text and wait for its embedding"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+    
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._worker = asyncio.create_task(self._run())
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._encode_batch(batch)
+    
+    async def _encode_batch(self, batch):
+        texts = [text for text, _, _ in batch]
+        try:
+            embeddings = await asyncio.to_thread(self.embedding_service.get_embeddings_batch, texts)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
         
-        results = self.client.search(
-            collection_name=self.collection_name,
-            query_vector=query_embedding,
-            limit=limit,
-            score_threshold=score_threshold,
-            query_filter=filter_conditions
+        finished = time.perf_counter()
+        self.total_batches += 1
+        self.total_requests += len(batch)
+        self._batch_sizes.append(len(batch))
+        for (_, future, queued_at), embedding in zip(batch, embeddings):
+            self._latencies.append(finished - queued_at)
+            if not future.done():
+                future.set_result(embedding)
+    
+    async def stop(self):
+        """Cancel the background worker"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Batch size and latency metrics over the most recent batches"""
+        batch_sizes = list(self._batch_sizes)
+        latencies = list(self._latencies)
+        return {
+            "total_requests": self.total_requests,
+            "total_batches": self.total_batches,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "avg_batch_size": sum(batch_sizes) / len(batch_sizes) if batch_sizes else 0,
+            "max_batch_size": max(batch_sizes) if batch_sizes else 0,
+            "latency_p50": _percentile(latencies, 50),
+            "latency_p95": _percentile(latencies, 95),
+            "latency_p99": _percentile(latencies, 99)
+        }
+
+_embedding_batcher: Optional[EmbeddingBatcher] = None
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """Return the process-wide EmbeddingBatcher for async query embedding"""
+    global _embedding_batcher
+    if _embedding_batcher is None:
+        _embedding_batcher = EmbeddingBatcher(get_embedding_service())
+    return _embedding_batcher
+
+_search_cache: Optional[SearchResultCache] = None
+
+def get_search_cache() -> SearchResultCache:
+    """Return the process-wide cache of vector search results"""
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SearchResultCache(
+            max_size=settings.SEARCH_CACHE_SIZE,
+            ttl=settings.SEARCH_CACHE_TTL
+        )
+    return _search_cache
+
+_generation_cache: Optional[GenerationCache] = None
+
+def get_generation_cache() -> Optional[GenerationCache]:
+    """Return the process-wide LLM response cache, or None when disabled"""
+    global _generation_cache
+    if _generation_cache is None and settings.GENERATION_CACHE_BACKEND != "none":
+        redis_conn = None
+        if settings.GENERATION_CACHE_BACKEND == "redis":
+            from .workers import Redis, REDIS_URL
+            if Redis is None:
+                print("⚠️ redis is not installed, caching LLM responses in memory")
+            else:
+                # Own connection with short timeouts: a cache lookup must fail fast
+                redis_conn = Redis.from_url(
+                    REDIS_URL,
+                    socket_connect_timeout=settings.GENERATION_CACHE_REDIS_TIMEOUT,
+                    socket_timeout=settings.GENERATION_CACHE_REDIS_TIMEOUT
+                )
+        _generation_cache = GenerationCache(
+            max_size=settings.GENERATION_CACHE_SIZE,
+            ttl=settings.GENERATION_CACHE_TTL,
+            redis_conn=redis_conn,
+            retry_interval=settings.REDIS_RETRY_INTERVAL
+        )
+    return _generation_cache
+
+_semantic_cache: Optional[SemanticCache] = None
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Return the process-wide near-duplicate generation cache, or None when disabled"""
+    global _semantic_cache
+    if _semantic_cache is None and settings.SEMANTIC_CACHE_ENABLED:
+        _semantic_cache = SemanticCache(
+            dimension=get_embedding_service().dimension,
+            max_size=settings.SEMANTIC_CACHE_SIZE,
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            ttl=settings.SEMANTIC_CACHE_TTL,
+            min_overlap=settings.SEMANTIC_CACHE_MIN_OVERLAP
         )
+    return _semantic_cache
+
+class VectorService:
+    def __init__(self, backend: Optional[VectorBackend] = None):
+        self.backend = backend or get_vector_backend()
+        self.result_cache = get_search_cache()
+        self.batch_size = settings.VECTOR_UPSERT_BATCH_SIZE
+        self.concurrency = settings.VECTOR_UPSERT_CONCURRENCY
+        self.max_retries = settings.VECTOR_UPSERT_RETRIES
+    
+    def add_chunks(self, chunks: List[ContentChunk], embeddings: np.ndarray,
+                   progress_callback: Optional[Callable[[int, int], None]] = None):
+        """Add content chunks to vector database in concurrent batches.
         
-        return [
+        At most `concurrency` batches are in flight; progress_callback(done, total)
+        is called from this thread after each batch lands.
+        """
+        ids, payloads = self.build_points(chunks)
+        self.add_points(ids, embeddings, payloads, progress_callback)
+    
+    def add_points(self, ids: List[str], embeddings: np.ndarray, payloads: List[Dict[str, Any]],
+                   progress_callback: Optional[Callable[[int, int], None]] = None):
+        """Like add_chunks, for points already built with build_points"""
+        try:
+            self._upsert_all(ids, embeddings, payloads, progress_callback)
+        finally:
+            # Even a partial write changes what these sources return
+            self.result_cache.invalidate_sources({payload["source_id"] for payload in payloads})
+    
+    def _upsert_all(self, ids: List[str], embeddings: np.ndarray, payloads: List[Dict[str, Any]],
+                    progress_callback: Optional[Callable[[int, int], None]]):
+        total = len(ids)
+        if total <= self.batch_size:
+            # One batch gains nothing from a pool; callers such as the ingest
+            # pipeline already overlap it with their other work
+            self._upsert_batch(ids, embeddings, payloads)
+            if progress_callback:
+                progress_callback(total, total)
+            return
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            pending = set()
+            for start in range(0, total, self.batch_size):
+                if len(pending) >= self.concurrency:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    done += sum(future.result() for future in finished)
+                    if progress_callback:
+                        progress_callback(done, total)
+                end = start + self.batch_size
+                pending.add(executor.submit(
+                    self._upsert_batch, ids[start:end], embeddings[start:end], payloads[start:end]
+                ))
+            
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                done += sum(future.result() for future in finished)
+                if progress_callback:
+                    progress_callback(done, total)
+    
+    def _upsert_batch(self, ids: List[str], embeddings: np.ndarray, payloads: List[Dict[str, Any]]) -> int:
+        """Upsert one batch, retrying with exponential backoff"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.backend.upsert(ids, embeddings, payloads)
+                return len(ids)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                print(f"Vector upsert failed (attempt {attempt + 1}), retrying: {e}")
+                time.sleep(0.5 * 2 ** attempt)
+    
+    def build_points(self, chunks: List[ContentChunk]):
+        """Point ids and payloads for chunks; reads only loaded chunk attributes"""
+        ids = [str(chunk.id) for chunk in chunks]
+        payloads = [
             {
-                "id": result.id,
-                "score": result.score,
-                "payload": result.payload
+                "source_id": str(chunk.source_id),
+                "chunk_index": chunk.chunk_index,
+                "start_position": chunk.start_position,
+                "end_position": chunk.end_position,
+                "start_time": chunk.start_time,
+                "end_time": chunk.end_time,
+                "token_count": chunk.token_count,
+                "metadata": chunk.chunk_metadata or {}
             }
-            for result in results
+            for chunk in chunks
         ]
+        # Chunk text already lives in content_chunks; attach_chunk_text restores it
+        if settings.VECTOR_PAYLOAD_INCLUDE_TEXT:
+            for payload, chunk in zip(payloads, chunks):
+                payload["chunk_text"] = chunk.chunk_text
+        return ids, payloads
+    
+    def delete_chunks(self, chunk_ids: List[str], source_ids: Optional[List[str]] = None):
+        """Remove chunk vectors from the vector database"""
+        if chunk_ids:
+            self.backend.delete([str(chunk_id) for chunk_id in chunk_ids])
+            self.result_cache.invalidate_sources(source_ids)
+    
+    def update_payloads(self, chunk_ids: List[str], payloads: List[Dict[str, Any]],
+                        source_ids: Optional[List[str]] = None):
+        """Merge fields into existing chunk payloads without re-upserting vectors"""
+        if chunk_ids:
+            self.backend.update_payloads([str(chunk_id) for chunk_id in chunk_ids], payloads)
+            self.result_cache.invalidate_sources(source_ids)
+    
+    def search(self, query_embedding: np.ndarray, source_id: Optional[str] = None, 
+               limit: int = 10, score_threshold: float = 0.7) -> List[Dict[str, Any]]:
+        """Search for similar chunks"""
+        key = self.result_cache.key_for(query_embedding, source_id, limit, score_threshold)
+        results = self.result_cache.get(key)
+        if results is None:
+            results = self.backend.search(
+                query_embedding,
+                source_id=source_id,
+                limit=limit,
+                score_threshold=score_threshold
+            )
+            self.result_cache.set(key, results)
+        return results
+    
+    def search_batch(self, query_embeddings: np.ndarray, source_ids: List[Optional[str]],
+                     limits: List[int], score_thresholds: List[float]) -> List[List[Dict[str, Any]]]:
+        """Search for several queries in one backend call, results in query order"""
+        keys = [
+            self.result_cache.key_for(embedding, source_id, limit, threshold)
+            for embedding, source_id, limit, threshold
+            in zip(query_embeddings, source_ids, limits, score_thresholds)
+        ]
+        results = [self.result_cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            fetched = self.backend.search_batch(
+                query_embeddings[missing],
+                [source_ids[i] for i in missing],
+                [limits[i] for i in missing],
+                [score_thresholds[i] for i in missing]
+            )
+            for i, result in zip(missing, fetched):
+                self.result_cache.set(keys[i], result)
+                results[i] = result
+        return results
 
-class ContentService:
+def attach_chunk_text(db: Session, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fill payload["chunk_text"] from the database for search results missing it"""
+    missing = [result for result in results if "chunk_text" not in (result.get("payload") or {})]
+    if missing:
+        ids = [str(result["id"]) for result in missing]
+        texts = dict(db.query(ContentChunk.id, ContentChunk.chunk_text).filter(ContentChunk.id.in_(ids)).all())
+        for result in missing:
+            result["payload"] = dict(result.get("payload") or {})
+            result["payload"]["chunk_text"] = texts.get(str(result["id"]))
+    return results
+
+_CHUNK_COLUMNS = [
+    "id", "source_id", "chunk_text", "chunk_index", "start_position", "end_position",
+    "start_time", "end_time", "token_count", "content_hash", "embedding", "chunk_metadata"
+]
+
+def bulk_insert_chunks(db: Session, chunks: List[ContentChunk], batch_size: Optional[int] = None,
+                       commit: bool = True) -> int:
+    """Insert chunk rows with executemany, bypassing the ORM unit of work.
+    
+    Chunks must already carry their ids (the ids sent to the vector store)
+    and are left transient, so their attributes stay readable after commit.
+    With commit=True every batch_size rows are committed as one transaction.
+    """
+    batch_size = batch_size or settings.CHUNK_INSERT_BATCH_SIZE
+    table = ContentChunk.__table__
+    now = datetime.utcnow()
+    for start in range(0, len(chunks), batch_size):
+        rows = [
+            dict({column: getattr(chunk, column) for column in _CHUNK_COLUMNS}, created_at=now)
+            for chunk in chunks[start:start + batch_size]
+        ]
+        db.execute(table.insert(), rows)
+        if commit:
+            db.commit()
+    return len(chunks)
+
+class RetrievalService:
+    """Hybrid retrieval: BM25 over chunk text fused with vector similarity"""
+    
     def __init__(self, db: Session):
         self.db = db
-        self.embedding_service = EmbeddingService()
+        self.embedding_service = get_embedding_service()
+        self.vector_service = VectorService()
+        self.lexical_index = LexicalIndex(db)
+    
+    def hybrid_search(self, query: str, source_id: Optional[str] = None, limit: int = 10,
+                      score_threshold: float = 0.7,
+                      query_embedding: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Reciprocal-rank fusion of lexical and vector results"""
+        candidates = limit * 2
+        lexical_results = self.lexical_index.search(query, source_id=source_id, limit=candidates)
+        if query_embedding is None:
+            query_embedding = self.embedding_service.get_embedding(query)
+        vector_results = self.vector_service.search(
+            query_embedding, source_id=source_id, limit=candidates, score_threshold=score_threshold
+        )
+        attach_chunk_text(self.db, vector_results)
+        return reciprocal_rank_fusion({"vector": vector_results, "lexical": lexical_results}, limit)
+
+class IngestBatch:
+    """A batch of chunks moving through the ingestion pipeline"""
+    
+    def __init__(self, chunks: List[ContentChunk]):
+        self.chunks = chunks
+        self.embeddings: Optional[np.ndarray] = None
+        self.point_ids: List[str] = []
+        self.payloads: List[Dict[str, Any]] = []
+    
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+class ContentService:
+    def __init__(self, db: Session, progress_callback: Optional[Callable[[float, Optional[str]], None]] = None):
+        self.db = db
+        self.progress_callback = progress_callback
+        self.embedding_service = get_embedding_service()
         self.vector_service = VectorService()
+        self.lexical_index = LexicalIndex(db)
     
     def process_text_content(self, source_id: str, file_path: str) -> bool:
-        """Process text content and create chunks"""
+        """Stream a text file through chunking, embedding and indexing.
+        
+        Chunk batches flow through a pipeline of embed, store and vector-index
+        stages running concurrently, so batch N+1 is embedded while batch N is
+        being written. Per-stage throughput is recorded in the source metadata.
+        
+        If another processed source has the same file hash, its chunks and
+        embeddings are copied instead of chunking and embedding the file again.
+        Chunks left by an interrupted earlier run are removed first, so a
+        recovered or retried job does not index them twice.
+        """
         try:
-            # Read file content
+            source = self._start_processing(source_id, file_path)
+            self._clear_chunks(source_id)
+            original = self._find_processed_duplicate(source)
+            if original is not None:
+                self._clone_source(source, original)
+                return True
             with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Update source status
+                stage_metrics = self._run_ingestion(source, self._chunk_batches(f, source_id))
+            self._finish_processing(source, {"ingestion": stage_metrics})
+            return True
+        except Exception as e:
+            self._mark_failed(source_id)
+            raise e
+    
+    def process_audio_content(self, source_id: str, file_path: str) -> bool:
+        """Process an audio/video source.
+        
+        No transcription backend is configured, so only re-uploads of an
+        already processed file can be completed (by reusing its transcript,
+        chunks and embeddings); anything else is marked failed.
+        """
+        try:
             source = self.db.query(ContentSource).filter(ContentSource.id == source_id).first()
             source.status = "processing"
-            source.transcript = content
+            if not source.content_hash:
+                source.content_hash = file_sha256(file_path)
+            source.file_path = file_path
             self.db.commit()
+            self._clear_chunks(source_id)
             
-            # Chunk the content
-            chunks = self._chunk_text(content, source_id)
-            
-            # Generate embeddings
-            chunk_texts = [chunk.chunk_text for chunk in chunks]
-            embeddings = self.embedding_service.get_embeddings_batch(chunk_texts)
+            original = self._find_processed_duplicate(source)
+            if original is None:
+                raise RuntimeError("No transcription backend is configured for audio/video sources")
+            source.transcript = original.transcript
+            self._clone_source(source, original)
+            return True
+        except Exception as e:
+            self._mark_failed(source_id)
+            raise e
+    
+    def reprocess_text_content(self, source_id: str, file_path: str) -> Dict[str, int]:
+        """Re-ingest an edited file for an existing source, touching only changed chunks.
+        
+        New chunks are matched to stored ones by content hash. Matches keep
+        their row and vector (only positions are updated), unmatched new
+        chunks are embedded and indexed, and stored chunks with no match are
+        deleted from the database and both indexes.
+        """
+        try:
+            previous_path = self.db.query(ContentSource.file_path).filter(ContentSource.id == source_id).scalar()
+            source = self._start_processing(source_id, file_path)
             
-            # Save chunks to database
-            for chunk in chunks:
-                self.db.add(chunk)
-            self.db.commit()
+            stored: Dict[str, List[str]] = {}
+            for chunk_id, chunk_hash in self.db.query(ContentChunk.id, ContentChunk.content_hash).filter(
+                ContentChunk.source_id == source_id
+            ):
+                stored.setdefault(chunk_hash, []).append(chunk_id)
+            kept: List[Dict[str, Any]] = []
             
-            # Add to vector database
-            self.vector_service.add_chunks(chunks, embeddings)
+            def changed_batches(batches: Iterator[IngestBatch]) -> Iterator[IngestBatch]:
+                for batch in batches:
+                    fresh = []
+                    for chunk in batch.chunks:
+                        matches = stored.get(chunk.content_hash)
+                        if matches:
+                            kept.append({
+                                "id": matches.pop(),
+                                "chunk_index": chunk.chunk_index,
+                                "start_position": chunk.start_position,
+                                "end_position": chunk.end_position
+                            })
+                        else:
+                            fresh.append(chunk)
+                    if fresh:
+                        yield IngestBatch(fresh)
             
-            # Update source status
-            source.status = "processed"
-            self.db.commit()
+            with open(file_path, 'r', encoding='utf-8') as f:
+                stage_metrics = self._run_ingestion(source, changed_batches(self._chunk_batches(f, source_id)))
             
-            return True
+            removed = [chunk_id for chunk_ids in stored.values() for chunk_id in chunk_ids]
+            self._update_kept_chunks(source_id, kept)
+            self._delete_chunks(source_id, removed)
             
+            summary = {
+                "unchanged_chunks": len(kept),
+                "embedded_chunks": stage_metrics["embed"]["items"],
+                "deleted_chunks": len(removed)
+            }
+            self._finish_processing(source, {"ingestion": stage_metrics, "reprocess": summary})
+            if previous_path and previous_path != file_path:
+                self._remove_unreferenced_file(previous_path)
+            return summary
         except Exception as e:
-            # Update source status to failed
-            source = self.db.query(ContentSource).filter(ContentSource.id == source_id).first()
+            self._mark_failed(source_id)
+            raise e
+    
+    def _start_processing(self, source_id: str, file_path: str) -> ContentSource:
+        source = self.db.query(ContentSource).filter(ContentSource.id == source_id).first()
+        source.status = "processing"
+        if source.file_path != file_path or not source.content_hash:
+            source.content_hash = file_sha256(file_path)
+        source.file_path = file_path
+        # Keep small files viewable as a transcript; large ones stay on disk only
+        if os.path.getsize(file_path) <= settings.TRANSCRIPT_MAX_BYTES:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                source.transcript = f.read()
+        else:
+            source.transcript = None
+        self.db.commit()
+        return source
+    
+    def _finish_processing(self, source: ContentSource, metadata_updates: Dict[str, Any]):
+        metadata = dict(source.content_metadata or {})
+        metadata.update(metadata_updates)
+        source.content_metadata = metadata
+        source.status = "processed"
+        self.db.commit()
+    
+    def _remove_unreferenced_file(self, file_path: str):
+        """Delete a replaced upload unless a deduplicated source still points at it"""
+        if self.db.query(ContentSource.id).filter(ContentSource.file_path == file_path).first():
+            return
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+    
+    def _mark_failed(self, source_id: str):
+        self.db.rollback()
+        source = self.db.query(ContentSource).filter(ContentSource.id == source_id).first()
+        if source:
             source.status = "failed"
             self.db.commit()
-            raise e
     
-    def _chunk_text(self, text: str, source_id: str, chunk_size: int = 500, 
-                   overlap: int = 50) -> List[ContentChunk]:
-        """Chunk text into overlapping segments"""
-        chunks = []
-        start = 0
-        chunk_index = 0
+    def _run_ingestion(self, source: ContentSource, batches: Iterator["IngestBatch"]) -> Dict[str, Any]:
+        progress = {"indexed_chunks": 0, "total_chars": os.path.getsize(source.file_path) or 1}
+        pipeline = Pipeline(
+            [
+                ("embed", self._embed_batch),
+                ("store", lambda batch: self._store_batch(source, batch, progress)),
+                ("index", self._index_batch)
+            ],
+            queue_size=settings.INGEST_QUEUE_SIZE,
+            source_name="chunk"
+        )
+        return pipeline.run(batches)
+    
+    def _update_kept_chunks(self, source_id: str, kept: List[Dict[str, Any]]):
+        """Move unchanged chunks to their new positions in the database and vector payloads"""
+        if not kept:
+            return
+        table = ContentChunk.__table__
+        self.db.execute(
+            table.update().where(table.c.id == bindparam("b_id")).values(
+                chunk_index=bindparam("b_chunk_index"),
+                start_position=bindparam("b_start_position"),
+                end_position=bindparam("b_end_position")
+            ),
+            [{f"b_{key}": value for key, value in row.items()} for row in kept]
+        )
+        self.db.commit()
+        self.vector_service.update_payloads(
+            [row["id"] for row in kept],
+            [{key: row[key] for key in ("chunk_index", "start_position", "end_position")} for row in kept],
+            source_ids=[source_id]
+        )
+    
+    def _clear_chunks(self, source_id: str):
+        """Remove every chunk of a source from the database and both indexes"""
+        chunk_ids = [chunk_id for (chunk_id,) in self.db.query(ContentChunk.id).filter(
+            ContentChunk.source_id == source_id
+        )]
+        self._delete_chunks(source_id, chunk_ids)
+    
+    def _delete_chunks(self, source_id: str, chunk_ids: List[str]):
+        if not chunk_ids:
+            return
+        self.vector_service.delete_chunks(chunk_ids, source_ids=[source_id])
+        self.lexical_index.delete_chunks(chunk_ids)
+        for start in range(0, len(chunk_ids), settings.CHUNK_INSERT_BATCH_SIZE):
+            batch = chunk_ids[start:start + settings.CHUNK_INSERT_BATCH_SIZE]
+            self.db.query(ContentChunk).filter(ContentChunk.id.in_(batch)).delete(synchronize_session=False)
+        self.db.commit()
+    
+    def _find_processed_duplicate(self, source: ContentSource) -> Optional[ContentSource]:
+        if not settings.DEDUP_UPLOADS or not source.content_hash:
+            return None
+        return self.db.query(ContentSource).filter(
+            ContentSource.content_hash == source.content_hash,
+            ContentSource.id != source.id,
+            ContentSource.status == "processed"
+        ).order_by(ContentSource.created_at).first()
+    
+    def _clone_source(self, source: ContentSource, original: ContentSource):
+        """Copy an identical source's chunks and embeddings instead of re-embedding"""
+        reused = {"chunks": 0, "embeddings": 0}
+        stage_metrics = self._run_ingestion(source, self._cloned_batches(original.id, source.id, reused))
+        dedup = dict((source.content_metadata or {}).get("dedup") or {})
+        dedup.update({
+            "duplicate_of": original.id,
+            "reused_chunks": reused["chunks"],
+            "reused_embeddings": reused["embeddings"]
+        })
+        self._finish_processing(source, {"ingestion": stage_metrics, "dedup": dedup})
+    
+    def _cloned_batches(self, original_id: str, source_id: str, reused: Dict[str, int]) -> Iterator["IngestBatch"]:
+        """Copies of another source's chunks under new ids, carrying their stored embeddings"""
+        columns = [column for column in _CHUNK_COLUMNS if column not in ("id", "source_id", "embedding")]
+        last_index = -1
+        # The store stage owns self.db, so read through a session of our own
+        with Session(bind=self.db.get_bind()) as reader:
+            while True:
+                originals = reader.query(ContentChunk).filter(
+                    ContentChunk.source_id == original_id,
+                    ContentChunk.chunk_index > last_index
+                ).order_by(ContentChunk.chunk_index).limit(settings.INGEST_BATCH_SIZE).all()
+                if not originals:
+                    return
+                last_index = originals[-1].chunk_index
+                batch = IngestBatch([
+                    ContentChunk(
+                        id=str(uuid.uuid4()),
+                        source_id=source_id,
+                        **{column: getattr(chunk, column) for column in columns}
+                    )
+                    for chunk in originals
+                ])
+                # Chunks stored without an embedding send the batch through the model
+                if all(chunk.embedding is not None for chunk in originals):
+                    batch.embeddings = np.vstack([as_float32(chunk.embedding) for chunk in originals])
+                    reused["embeddings"] += len(batch)
+                reused["chunks"] += len(batch)
+                reader.rollback()
+                yield batch
+    
+    def _chunk_batches(self, file: TextIO, source_id: str) -> Iterator["IngestBatch"]:
+        chunk_stream = self._chunk_text(file, source_id)
+        while True:
+            chunks = list(itertools.islice(chunk_stream, settings.INGEST_BATCH_SIZE))
+            if not chunks:
+                return
+            yield IngestBatch(chunks)
+    
+    # Pipeline stages. Only the store stage touches the database session.
+    def _embed_batch(self, batch: "IngestBatch") -> "IngestBatch":
+        if batch.embeddings is not None:
+            return batch  # Reused from a duplicate source
+        batch.embeddings = self.embedding_service.get_embeddings_batch([chunk.chunk_text for chunk in batch.chunks])
+        return batch
+    
+    def _store_batch(self, source: ContentSource, batch: "IngestBatch", progress: Dict[str, int]) -> "IngestBatch":
+        for chunk, embedding in zip(batch.chunks, batch.embeddings):
+            chunk.embedding = embedding
+        bulk_insert_chunks(self.db, batch.chunks, commit=False)
+        self.lexical_index.add_chunks(batch.chunks)
+        batch.point_ids, batch.payloads = self.vector_service.build_points(batch.chunks)
         
-        while start < len(text):
-            end = min(start + chunk_size, len(text))
-            chunk_text = text[start:end]
-            
-            # Create chunk object
-            chunk = ContentChunk(
+        progress["indexed_chunks"] += len(batch)
+        metadata = dict(source.content_metadata or {})
+        metadata["indexing"] = {
+            "indexed_chunks": progress["indexed_chunks"],
+            "processed_chars": batch.chunks[-1].end_position
+        }
+        source.content_metadata = metadata
+        self.db.commit()
+        if self.progress_callback:
+            # File size is in bytes, so this slightly underestimates non-ASCII text
+            self.progress_callback(
+                min(0.99, batch.chunks[-1].end_position / progress["total_chars"]),
+                f"Indexed {progress['indexed_chunks']} chunks"
+            )
+        return batch
+    
+    def _index_batch(self, batch: "IngestBatch") -> "IngestBatch":
+        # Upserts here overlap with embedding and storing the following batches,
+        # which stands in for VectorService's concurrent upserts: an ingest batch
+        # fits in one upsert batch, so add_points writes it inline without a pool
+        self.vector_service.add_points(batch.point_ids, batch.embeddings, batch.payloads)
+        return batch
+    
+    def _chunk_text(self, file: TextIO, source_id: str) -> Iterator[ContentChunk]:
+        """Lazily split a text file into sentence-aligned chunks within the token budget"""
+        chunker = TokenChunker(
+            self.embedding_service.count_tokens,
+            max_tokens=self.embedding_service.max_tokens,
+            overlap_tokens=settings.CHUNK_OVERLAP,
+            anchor=sentence_anchor
+        )
+        
+        for chunk_index, span in enumerate(chunker.chunk(iter_sentences(file))):
+            # Assign the id up front: it is both the row id and the vector point id
+            yield ContentChunk(
+                id=str(uuid.uuid4()),
                 source_id=source_id,
-                chunk_text=chunk_text,
+                chunk_text=span.text,
                 chunk_index=chunk_index,
-                start_position=start,
-                end_position=end,
-                token_count=len(chunk_text.split()),
-                metadata={"chunk_size": chunk_size, "overlap": overlap}
+                start_position=span.start,
+                end_position=span.end,
+                token_count=span.token_count,
+                content_hash=content_hash(span.text),
+                chunk_metadata={"max_tokens": chunker.max_tokens, "overlap_tokens": chunker.overlap_tokens}
             )
-            
-            chunks.append(chunk)
-            start = end - overlap
-            chunk_index += 1
-        
-        return chunks
 
 class GenerationService:
-    def __init__(self):
+    def __init__(self, db: Optional[Session] = None):
         self.llm_service_url = settings.LLM_SERVICE_URL
-        self.vector_service = VectorService()
+        self.db = db
     
     async def generate_content(self, source_id: str, content_types: List[str], 
-                             custom_prompts: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
-        """Generate content for specified types"""
+                             custom_prompts: Optional[Dict[str, str]] = None,
+                             on_result: Optional[Callable[[str, Dict[str, Any]], Any]] = None,
+                             bypass_cache: bool = False) -> Dict[str, Any]:
+        """Generate content for specified types concurrently.
         
-        # Get source chunks
-        chunks = self._get_relevant_chunks(source_id)
+        At most GENERATION_CONCURRENCY LLM calls run at once and each type
+        gets GENERATION_TYPE_TIMEOUT seconds. A type that fails or times out
+        gets {"type", "error"} instead of failing the others; if every type
+        fails the first error is raised. on_result(content_type, result) is
+        called as each type completes; if it returns an awaitable, that is
+        awaited while the remaining types keep running. bypass_cache skips cached LLM
+        responses (fresh ones are still stored).
+        """
+        
+        # Get source chunks, ranked against what the source is about
+        query = None
+        if self.db is not None:
+            source = self.db.query(ContentSource).filter(ContentSource.id == source_id).first()
+            if source:
+                query = " ".join(filter(None, [source.title, source.description]))
+        chunks = self._get_relevant_chunks(source_id, query=query)
+        
+        semaphore = asyncio.Semaphore(settings.GENERATION_CONCURRENCY)
+        errors: List[Exception] = []
+        
+        async def generate_one(content_type: str):
+            async with semaphore:
+                try:
+                    # Get prompt template
+                    prompt = self._get_prompt_template(content_type, custom_prompts)
+                    
+                    # Generate content
+                    content = await asyncio.wait_for(
+                        self._call_llm(prompt, chunks, bypass_cache=bypass_cache), settings.GENERATION_TYPE_TIMEOUT
+                    )
+                    
+                    # Parse and structure content
+                    return content_type, self._parse_content(content, content_type)
+                except asyncio.TimeoutError as e:
+                    errors.append(e)
+                    return content_type, {"type": content_type, "error": f"Timed out after {settings.GENERATION_TYPE_TIMEOUT}s"}
+                except Exception as e:
+                    errors.append(e)
+                    return content_type, {"type": content_type, "error": str(e)}
         
         results = {}
-        for content_type in content_types:
-            # Get prompt template
-            prompt = self._get_prompt_template(content_type, custom_prompts)
-            
-            # Generate content
-            content = await self._call_llm(prompt, chunks)
-            
-            # Parse and structure content
-            structured_content = self._parse_content(content, content_type)
-            results[content_type] = structured_content
+        content_types = list(dict.fromkeys(content_types))
+        for completed in asyncio.as_completed([generate_one(content_type) for content_type in content_types]):
+            content_type, result = await completed
+            results[content_type] = result
+            if on_result:
+                outcome = on_result(content_type, result)
+                if inspect.isawaitable(outcome):
+                    await outcome
         
-        return results
+        if content_types and len(errors) == len(content_types):
+            raise errors[0]
+        return {content_type: results[content_type] for content_type in content_types}
     
-    def _get_relevant_chunks(self, source_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+    def _get_relevant_chunks(self, source_id: str, query: Optional[str] = None,
+                             limit: int = 5) -> List[Dict[str, Any]]:
         """Get most relevant chunks for content generation"""
-        # This would typically use semantic search
-        # For now, we'll get chunks by source_id
-        return []  # Placeholder
+        if self.db is None:
+            return []
+        if query:
+            results = RetrievalService(self.db).hybrid_search(
+                query, source_id=source_id, limit=limit, score_threshold=0.0
+            )
+            if results:
+                return [{"id": str(r["id"]), "text": r["payload"].get("chunk_text"), "score": r["score"]} for r in results]
+        
+        # No query or no matches: fall back to the opening chunks of the source
+        chunks = self.db.query(ContentChunk).filter(
+            ContentChunk.source_id == source_id
+        ).order_by(ContentChunk.chunk_index).limit(limit).all()
+        return [{"id": str(chunk.id), "text": chunk.chunk_text, "score": None} for chunk in chunks]
     
     def _get_prompt_template(self, content_type: str, custom_prompts: Optional[Dict[str, str]] = None) -> str:
         """Get prompt template for content type"""
@@ -217,10 +956,8 @@ class GenerationService:
         
         return templates.get(content_type, "Generate content based on the provided source material.")
     
-    async def _call_llm(self, prompt: str, chunks: List[Dict[str, Any]]) -> str:
-        """Call LLM service to generate content"""
-        import aiohttp
-        
+    async def _call_llm(self, prompt: str, chunks: List[Dict[str, Any]], bypass_cache: bool = False) -> str:
+        """Call LLM service to generate content, answering repeats from the generation cache"""
         payload = {
             "prompt": prompt,
             "context": chunks,
@@ -228,10 +965,40 @@ class GenerationService:
             "temperature": 0.7
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(f"{self.llm_service_url}/generate", json=payload) as response:
-                result = await response.json()
-                return result.get("generated_text", "")
+        cache = get_generation_cache()
+        cache_key = generation_cache_key(
+            f"llm_service:{self.llm_service_url}", None, prompt, [chunk["id"] for chunk in chunks],
+            payload["temperature"], payload["max_tokens"]
+        )
+        if cache is not None:
+            if bypass_cache:
+                cache.record_bypass()
+            else:
+                cached = await cache.get(cache_key)
+                if cached is not None:
+                    return cached
+        
+        breaker = get_circuit_breaker("llm_service")
+        if not breaker.allow_request():
+            raise LLMError("LLM service circuit open")
+        
+        started = time.perf_counter()
+        try:
+            status, result = await post_json(f"{self.llm_service_url}/generate", payload)
+            if status != 200 or not isinstance(result, dict):
+                raise LLMError(f"LLM service error: {status} - {result}", status=status)
+        except asyncio.CancelledError:
+            # Cancelled by GENERATION_TYPE_TIMEOUT; counts as slow if it already was
+            breaker.record_cancelled(time.perf_counter() - started)
+            raise
+        except Exception:
+            breaker.record(False, time.perf_counter() - started)
+            raise
+        breaker.record(True, time.perf_counter() - started)
+        generated_text = result.get("generated_text", "")
+        if cache is not None:
+            await cache.set(cache_key, generated_text)
+        return generated_text
     
     def _parse_content(self, content: str, content_type: str) -> Dict[str, Any]:
         """Parse generated content into structured format"""
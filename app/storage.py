@@ -0,0 +1,178 @@
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+
+from fastapi import UploadFile
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .models import ContentSource
+
+UPLOAD_DIR = "uploads"
+UPLOAD_READ_SIZE = 1024 * 1024  # 1MB
+
+# Allowance for multipart boundaries, part headers and small form fields
+MULTIPART_OVERHEAD = 64 * 1024
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_size: int):
+        super().__init__(f"File exceeds the maximum upload size of {max_size} bytes")
+        self.max_size = max_size
+
+class UploadSizeLimitMiddleware:
+    """Reject multipart bodies over max_size before they are received in full.
+
+    FastAPI parses and spools the whole multipart body before a handler
+    runs, so a limit checked in the handler does not save bandwidth or
+    temporary disk. This ASGI middleware answers 413 at once when
+    Content-Length is over the limit, and stops reading a body without
+    Content-Length (chunked) as soon as it passes the limit.
+    """
+
+    def __init__(self, app, max_size: int):
+        self.app = app
+        self.max_body = max_size + MULTIPART_OVERHEAD
+        self.max_size = max_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/"):
+            return await self.app(scope, receive, send)
+
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body:
+            return await self._reject(send)
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    exceeded = True
+                    raise UploadTooLarge(self.max_size)
+            return message
+
+        async def limited_send(message):
+            nonlocal response_started
+            if exceeded:
+                # The app turned the aborted body into its own error; answer 413 instead
+                if message["type"] == "http.response.start" and not response_started:
+                    response_started = True
+                    await self._reject(send)
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except UploadTooLarge:
+            if response_started:
+                return
+            await self._reject(send)
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": str(UploadTooLarge(self.max_size))}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+async def save_upload(file: UploadFile, file_path: str, max_size: int) -> Tuple[int, str]:
+    """Stream an upload to disk in 1MB reads without blocking the event loop.
+
+    The size limit is checked again on the file part itself and a partial
+    file is removed if it is exceeded; UploadSizeLimitMiddleware has already
+    bounded the request body. Returns (byte count, sha256 hex digest).
+    """
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    out = await asyncio.to_thread(open, file_path, "wb")
+    try:
+        while True:
+            data = await file.read(UPLOAD_READ_SIZE)
+            if not data:
+                break
+            size += len(data)
+            if size > max_size:
+                raise UploadTooLarge(max_size)
+            digest.update(data)
+            await asyncio.to_thread(out.write, data)
+    except BaseException:
+        await asyncio.to_thread(out.close)
+        await asyncio.to_thread(_remove_quietly, file_path)
+        raise
+    await asyncio.to_thread(out.close)
+    return size, digest.hexdigest()
+
+def file_sha256(file_path: str) -> str:
+    """sha256 of a stored file, read in UPLOAD_READ_SIZE pieces"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for data in iter(lambda: f.read(UPLOAD_READ_SIZE), b""):
+            digest.update(data)
+    return digest.hexdigest()
+
+def find_stored_blob(db: Session, content_hash: str) -> Optional[ContentSource]:
+    """Oldest source whose file has this hash and is still on disk"""
+    sources = db.query(ContentSource).filter(
+        ContentSource.content_hash == content_hash
+    ).order_by(ContentSource.created_at)
+    for source in sources:
+        if source.file_path and os.path.exists(source.file_path):
+            return source
+    return None
+
+async def discard_upload(file_path: str):
+    await asyncio.to_thread(_remove_quietly, file_path)
+
+def get_dedup_stats(db: Session) -> Dict[str, Any]:
+    """Storage and embedding work saved by upload deduplication"""
+    total_sources, logical_bytes = db.query(
+        func.count(ContentSource.id), func.coalesce(func.sum(ContentSource.file_size), 0)
+    ).one()
+    # Sources sharing a blob share its file_path
+    blob_sizes = db.query(func.max(ContentSource.file_size).label("size")).group_by(ContentSource.file_path).subquery()
+    stored_blobs, stored_bytes = db.query(
+        func.count(), func.coalesce(func.sum(blob_sizes.c.size), 0)
+    ).select_from(blob_sizes).one()
+
+    duplicate_sources = 0
+    reused_chunks = 0
+    reused_embeddings = 0
+    for (metadata,) in db.query(ContentSource.content_metadata).filter(ContentSource.content_hash.isnot(None)):
+        dedup = (metadata or {}).get("dedup")
+        if not dedup:
+            continue
+        duplicate_sources += 1
+        reused_chunks += dedup.get("reused_chunks", 0)
+        reused_embeddings += dedup.get("reused_embeddings", 0)
+
+    return {
+        "total_sources": total_sources,
+        "stored_blobs": stored_blobs,
+        "duplicate_sources": duplicate_sources,
+        "logical_bytes": int(logical_bytes),
+        "stored_bytes": int(stored_bytes),
+        "bytes_saved": int(logical_bytes) - int(stored_bytes),
+        "reused_chunks": reused_chunks,
+        "reused_embeddings": reused_embeddings
+    }
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
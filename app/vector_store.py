@@ -0,0 +1,801 @@
+from typing import List, Dict, Any, Optional, Sequence
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from .config import settings
+from .vectors import (
+    as_float32, normalize, quantize_rows_int8, binarize, hamming_similarity
+)
+
+# Rows scored per block in the quantized first pass, bounding temporary memory
+_SCORE_BLOCK_ROWS = 65536
+
+# int8 rows cast to float32 at a time; small enough for the cast block to
+# stay in cache while BLAS scores it, so int8 costs about as much as float32
+_INT8_CAST_ROWS = 256
+
+# Row changes kept for other processes to catch up from; a process further
+# behind reloads the whole row table instead
+_CHANGE_LOG_KEEP = 100000
+
+class _FileLock:
+    """Exclusive lock on a file, held by one process at a time"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "a+b")
+
+    def __enter__(self):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+class VectorBackend:
+    """Storage and nearest-neighbour search for chunk vectors.
+
+    Payloads must carry a "source_id" so searches can be restricted to one
+    content source. Scores are cosine similarities.
+    """
+
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray, payloads: Sequence[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def delete(self, ids: Sequence[str]):
+        raise NotImplementedError
+
+    def update_payloads(self, ids: Sequence[str], payloads: Sequence[Dict[str, Any]]):
+        """Merge fields into the payloads of existing points, keeping their vectors"""
+        raise NotImplementedError
+
+    def search(self, query_vector: np.ndarray, source_id: Optional[str] = None,
+               limit: int = 10, score_threshold: float = 0.0, exact: bool = False) -> List[Dict[str, Any]]:
+        """Top-k search; exact=True bypasses quantization and approximate indexes"""
+        raise NotImplementedError
+
+    def search_batch(self, query_vectors: np.ndarray, source_ids: Sequence[Optional[str]],
+                     limits: Sequence[int], score_thresholds: Sequence[float]) -> List[List[Dict[str, Any]]]:
+        """Run several searches at once; results are returned in query order"""
+        return [
+            self.search(query_vector, source_id=source_id, limit=limit, score_threshold=score_threshold)
+            for query_vector, source_id, limit, score_threshold
+            in zip(query_vectors, source_ids, limits, score_thresholds)
+        ]
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+class QdrantBackend(VectorBackend):
+    """Vectors stored in a Qdrant collection at settings.QDRANT_URL"""
+
+    def __init__(self, url: Optional[str] = None, collection_name: str = "content_chunks",
+                 dimension: Optional[int] = None, quantization: Optional[str] = None):
+        from qdrant_client import QdrantClient
+
+        self.client = QdrantClient(url=url or settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
+        self.collection_name = collection_name
+        self.dimension = dimension or settings.EMBEDDING_DIMENSION
+        self.quantization = quantization or settings.VECTOR_QUANTIZATION
+        self._ensure_collection()
+
+    def _ensure_collection(self):
+        """Create the collection if it does not exist; connection errors propagate"""
+        from qdrant_client.models import Distance, VectorParams
+
+        existing = {collection.name for collection in self.client.get_collections().collections}
+        if self.collection_name not in existing:
+            self.client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=VectorParams(size=self.dimension, distance=Distance.COSINE),
+                quantization_config=self._quantization_config()
+            )
+
+    def _quantization_config(self):
+        """Collection-level quantization; Qdrant keeps the trained parameters"""
+        from qdrant_client.models import (
+            ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+            BinaryQuantization, BinaryQuantizationConfig
+        )
+
+        if self.quantization == "int8":
+            return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, always_ram=True))
+        if self.quantization == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def upsert(self, ids, vectors, payloads):
+        from qdrant_client.models import PointStruct
+
+        points = [
+            # The Qdrant wire format is JSON, so convert only at this boundary
+            PointStruct(id=point_id, vector=vector.tolist(), payload=payload)
+            for point_id, vector, payload in zip(ids, as_float32(vectors), payloads)
+        ]
+        self.client.upsert(collection_name=self.collection_name, points=points)
+
+    def delete(self, ids):
+        from qdrant_client.models import PointIdsList
+
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=PointIdsList(points=list(ids))
+        )
+
+    def update_payloads(self, ids, payloads):
+        from qdrant_client.models import SetPayload, SetPayloadOperation
+
+        operations = [
+            SetPayloadOperation(set_payload=SetPayload(payload=payload, points=[point_id]))
+            for point_id, payload in zip(ids, payloads)
+        ]
+        # One request per batch instead of one per point
+        for start in range(0, len(operations), settings.VECTOR_UPSERT_BATCH_SIZE):
+            self.client.batch_update_points(
+                collection_name=self.collection_name,
+                update_operations=operations[start:start + settings.VECTOR_UPSERT_BATCH_SIZE]
+            )
+
+    def _search_params(self, exact: bool = False):
+        from qdrant_client.models import SearchParams, QuantizationSearchParams
+
+        if exact:
+            return SearchParams(exact=True, quantization=QuantizationSearchParams(ignore=True))
+        if self.quantization != "none":
+            return SearchParams(quantization=QuantizationSearchParams(
+                rescore=True, oversampling=float(settings.VECTOR_RESCORE_FACTOR)
+            ))
+        return None
+
+    def _source_filter(self, source_id: Optional[str]):
+        from qdrant_client.models import Filter, FieldCondition, MatchValue
+
+        if not source_id:
+            return None
+        return Filter(must=[FieldCondition(key="source_id", match=MatchValue(value=source_id))])
+
+    def search(self, query_vector, source_id=None, limit=10, score_threshold=0.0, exact=False):
+        results = self.client.search(
+            collection_name=self.collection_name,
+            query_vector=as_float32(query_vector),
+            limit=limit,
+            score_threshold=score_threshold,
+            query_filter=self._source_filter(source_id),
+            search_params=self._search_params(exact)
+        )
+        return [_scored_point_to_dict(result) for result in results]
+
+    def search_batch(self, query_vectors, source_ids, limits, score_thresholds):
+        from qdrant_client.models import SearchRequest
+
+        requests = [
+            SearchRequest(
+                vector=query_vector.tolist(),
+                filter=self._source_filter(source_id),
+                limit=limit,
+                score_threshold=score_threshold,
+                params=self._search_params(),
+                with_payload=True
+            )
+            for query_vector, source_id, limit, score_threshold
+            in zip(as_float32(query_vectors), source_ids, limits, score_thresholds)
+        ]
+        batches = self.client.search_batch(collection_name=self.collection_name, requests=requests)
+        return [[_scored_point_to_dict(result) for result in results] for results in batches]
+
+    def count(self) -> int:
+        return self.client.count(collection_name=self.collection_name).count
+
+def _scored_point_to_dict(result) -> Dict[str, Any]:
+    return {
+        "id": result.id,
+        "score": result.score,
+        "payload": result.payload
+    }
+
+class LocalVectorBackend(VectorBackend):
+    """In-process index: normalized float32 rows in a memory-mapped file.
+
+    Row metadata (point id, source id, payload) lives in a SQLite file next
+    to the matrix. Searches are an exact matrix-vector product, restricted
+    to a precomputed row mask when a source_id is given. Upserting an
+    existing id overwrites its row; deleted rows are masked out and reused
+    by later appends. With index="hnsw" and hnswlib installed, an
+    approximate HNSW graph is kept alongside the matrix for large corpora.
+
+    With quantization="int8" or "binary", compact codes of every row are held
+    in memory and searched first; the best limit * rescore_factor candidates
+    are then re-scored against the float32 rows, so only those pages of the
+    memory-mapped matrix are touched. Per-dimension int8 scales are stored
+    in quantization.json next to the matrix.
+
+    Several processes (the API and RQ workers) may share one index. Writes
+    hold an exclusive file lock, so row allocation never races, and append
+    the rows they touched to a change log in the SQLite file. Every read
+    and write first replays the log entries written by other processes.
+    """
+
+    def __init__(self, path: Optional[str] = None, dimension: Optional[int] = None,
+                 index: Optional[str] = None, quantization: Optional[str] = None,
+                 rescore_factor: Optional[int] = None):
+        self.path = path or settings.LOCAL_VECTOR_PATH
+        self.dimension = dimension or settings.EMBEDDING_DIMENSION
+        self.index_type = index or settings.LOCAL_VECTOR_INDEX
+        self.quantization = quantization or settings.VECTOR_QUANTIZATION
+        self.rescore_factor = rescore_factor or settings.VECTOR_RESCORE_FACTOR
+        self._lock = threading.RLock()
+        os.makedirs(self.path, exist_ok=True)
+
+        self._matrix_path = os.path.join(self.path, "vectors.f32")
+        self._file_lock = _FileLock(os.path.join(self.path, "write.lock"))
+        self._conn = sqlite3.connect(os.path.join(self.path, "rows.db"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            "row INTEGER PRIMARY KEY, point_id TEXT UNIQUE NOT NULL, "
+            "source_id TEXT, payload TEXT)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, row INTEGER NOT NULL)")
+        self._conn.commit()
+
+        self._capacity = 0
+        self._matrix: Optional[np.memmap] = None
+        self._row_ids: List[Optional[str]] = []
+        self._row_sources: List[Optional[str]] = []
+        self._id_to_row: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._free_rows: List[int] = []
+        self._source_masks: Dict[str, np.ndarray] = {}
+        self._hnsw = None
+        self._codes: Optional[np.ndarray] = None
+        self._int8_scales: Optional[np.ndarray] = None
+        self._quantized_on = 0
+        self._quantization_version = 0
+        self._quantization_mtime: Optional[int] = None
+        self._seq = 0
+        with self._lock, self._file_lock:
+            self._load()
+
+    def _load(self):
+        # Read the log position first; changes committed meanwhile are replayed again later
+        self._seq = self._latest_seq()
+        rows = self._conn.execute("SELECT row, point_id, source_id FROM rows").fetchall()
+        size = max((row for row, _, _ in rows), default=-1) + 1
+        self._resize(size)
+
+        self._row_ids = [None] * size
+        self._row_sources = [None] * size
+        self._id_to_row = {}
+        self._source_masks = {}
+        self._alive = np.zeros(size, dtype=bool)
+        for row, point_id, source_id in rows:
+            self._row_ids[row] = point_id
+            self._row_sources[row] = source_id
+            self._id_to_row[point_id] = row
+            self._alive[row] = True
+        self._free_rows = [row for row in range(size) if not self._alive[row]]
+
+        if self.quantization != "none":
+            self._codes = None  # Re-encode every row, whatever the parameters
+            self._load_quantization()
+        if self.index_type == "hnsw":
+            self._build_hnsw()
+
+    def _latest_seq(self) -> int:
+        return self._conn.execute("SELECT MAX(seq) FROM changes").fetchone()[0] or 0
+
+    def _refresh(self):
+        """Apply rows changed by other processes since this process last looked"""
+        if self._quantization_changed():
+            self._load_quantization()
+        latest = self._latest_seq()
+        if latest == self._seq:
+            return
+        oldest = self._conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+        if oldest is None or oldest > self._seq + 1:
+            self._load()  # The entries we missed were pruned
+            return
+        changed = [row for (row,) in self._conn.execute(
+            "SELECT DISTINCT row FROM changes WHERE seq > ? AND seq <= ?", (self._seq, latest)
+        )]
+        self._apply_rows(changed)
+        self._seq = latest
+
+    def _apply_rows(self, rows: List[int]):
+        """Bring the in-memory state of rows in line with the rows table"""
+        if not rows:
+            return
+        stored = {}
+        for start in range(0, len(rows), 500):
+            batch = rows[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            for row, point_id, source_id in self._conn.execute(
+                f"SELECT row, point_id, source_id FROM rows WHERE row IN ({placeholders})", batch
+            ):
+                stored[row] = (point_id, source_id)
+
+        self._grow(max(rows) + 1)
+        touched_sources = set()
+        for row in rows:
+            old_id = self._row_ids[row]
+            if old_id is not None and self._id_to_row.get(old_id) == row:
+                del self._id_to_row[old_id]
+            touched_sources.add(self._row_sources[row])
+            point_id, source_id = stored.get(row, (None, None))
+            self._row_ids[row] = point_id
+            self._row_sources[row] = source_id
+            self._alive[row] = point_id is not None
+            if point_id is not None:
+                self._id_to_row[point_id] = row
+            touched_sources.add(source_id)
+        self._free_rows = np.flatnonzero(~self._alive).tolist()
+        self._invalidate_masks(touched_sources)
+
+        alive_rows = np.asarray([row for row in rows if self._alive[row]], dtype=np.int64)
+        if len(alive_rows) and self._codes is not None:
+            self._codes[alive_rows] = self._encode_rows(self._matrix[alive_rows])
+        if self._hnsw is not None:
+            if len(alive_rows):
+                self._hnsw.add_items(np.asarray(self._matrix[alive_rows]), alive_rows)
+            for row in rows:
+                if not self._alive[row]:
+                    try:
+                        self._hnsw.mark_deleted(row)
+                    except RuntimeError:
+                        pass  # Never added here, or already deleted
+
+    def _log_changes(self, rows: List[int]) -> int:
+        """Record rows this process wrote and return the new log position; the caller commits"""
+        self._conn.executemany("INSERT INTO changes (row) VALUES (?)", [(row,) for row in rows])
+        latest = self._latest_seq()
+        self._conn.execute("DELETE FROM changes WHERE seq <= ?", (latest - _CHANGE_LOG_KEEP,))
+        return latest
+
+    def _grow(self, size: int):
+        """Extend the row state, matrix, codes and HNSW graph to at least size rows"""
+        if len(self._row_ids) < size:
+            extra = size - len(self._row_ids)
+            self._row_ids.extend([None] * extra)
+            self._row_sources.extend([None] * extra)
+        self._resize(size)
+        if len(self._alive) < size:
+            self._alive = np.concatenate([self._alive, np.zeros(size - len(self._alive), dtype=bool)])
+        if self._codes is not None and len(self._codes) < self._capacity:
+            grown = np.zeros((self._capacity, self._codes.shape[1]), dtype=self._codes.dtype)
+            grown[:len(self._codes)] = self._codes
+            self._codes = grown
+        if self._hnsw is not None and self._hnsw.get_max_elements() < self._capacity:
+            self._hnsw.resize_index(self._capacity)
+
+    @property
+    def _quantization_path(self) -> str:
+        return os.path.join(self.path, "quantization.json")
+
+    def _quantization_changed(self) -> bool:
+        """True when another process retrained the quantization parameters"""
+        if self.quantization == "none":
+            return False
+        try:
+            return os.stat(self._quantization_path).st_mtime_ns != self._quantization_mtime
+        except FileNotFoundError:
+            return False
+
+    def _load_quantization(self):
+        params = {}
+        if os.path.exists(self._quantization_path):
+            self._quantization_mtime = os.stat(self._quantization_path).st_mtime_ns
+            with open(self._quantization_path) as f:
+                params = json.load(f)
+        if params.get("type") == self.quantization:
+            if self._codes is not None and params.get("version", 0) == self._quantization_version:
+                return
+            self._quantized_on = params.get("trained_on", 0)
+            self._quantization_version = params.get("version", 0)
+            if params.get("scales") is not None:
+                self._int8_scales = np.asarray(params["scales"], dtype=np.float32)
+            self._rebuild_codes()
+        else:
+            self._retrain_quantization()
+
+    def retrain_quantization(self):
+        """Re-derive quantization parameters from the stored rows and re-encode them"""
+        with self._lock, self._file_lock:
+            self._refresh()
+            self._retrain_quantization()
+
+    def _retrain_quantization(self):
+        # Caller holds both locks
+        alive_rows = np.flatnonzero(self._alive)
+        if self.quantization == "int8":
+            self._int8_scales = self._scales_from_rows(alive_rows)
+        self._quantized_on = len(alive_rows)
+        self._quantization_version += 1
+        # Written whole and renamed, so other processes never read a partial file
+        temporary_path = self._quantization_path + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump({
+                "type": self.quantization,
+                "version": self._quantization_version,
+                "trained_on": self._quantized_on,
+                "scales": self._int8_scales.tolist() if self._int8_scales is not None else None
+            }, f)
+        os.replace(temporary_path, self._quantization_path)
+        self._quantization_mtime = os.stat(self._quantization_path).st_mtime_ns
+        self._rebuild_codes()
+
+    def _scales_from_rows(self, rows: np.ndarray) -> np.ndarray:
+        if not len(rows):
+            # Normalized vectors never leave [-1, 1]
+            return np.full(self.dimension, 1 / 127, dtype=np.float32)
+        max_abs = np.zeros(self.dimension, dtype=np.float32)
+        for start in range(0, len(rows), _SCORE_BLOCK_ROWS):
+            block = rows[start:start + _SCORE_BLOCK_ROWS]
+            max_abs = np.maximum(max_abs, np.max(np.abs(self._matrix[block]), axis=0))
+        max_abs[max_abs == 0] = 1.0
+        return (max_abs / 127).astype(np.float32)
+
+    def _encode_rows(self, vectors: np.ndarray) -> np.ndarray:
+        if self.quantization == "int8":
+            return quantize_rows_int8(vectors, self._int8_scales)
+        return binarize(vectors)
+
+    def _rebuild_codes(self):
+        """Encode every stored row into the in-memory code matrix"""
+        width = self.dimension if self.quantization == "int8" else (self.dimension + 7) // 8
+        dtype = np.int8 if self.quantization == "int8" else np.uint8
+        self._codes = np.zeros((self._capacity, width), dtype=dtype)
+        size = len(self._row_ids)
+        for start in range(0, size, _SCORE_BLOCK_ROWS):
+            end = min(start + _SCORE_BLOCK_ROWS, size)
+            self._codes[start:end] = self._encode_rows(self._matrix[start:end])
+
+    def _resize(self, min_capacity: int):
+        """Grow the memory-mapped matrix to hold at least min_capacity rows"""
+        if min_capacity <= self._capacity and self._matrix is not None:
+            return
+        # Another process may already have grown the file; never shrink it
+        existing = os.path.getsize(self._matrix_path) // (4 * self.dimension) if os.path.exists(self._matrix_path) else 0
+        capacity = max(1024, self._capacity, existing)
+        while capacity < min_capacity:
+            capacity *= 2
+        if self._matrix is not None:
+            self._matrix.flush()
+        if capacity > existing:
+            with open(self._matrix_path, "ab") as f:
+                f.truncate(capacity * self.dimension * 4)
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="r+",
+                                 shape=(capacity, self.dimension))
+        self._capacity = capacity
+
+    def _build_hnsw(self):
+        try:
+            import hnswlib
+        except ImportError:
+            print("hnswlib not installed - using exact search for the local vector index")
+            self.index_type = "flat"
+            return
+
+        index = hnswlib.Index(space="ip", dim=self.dimension)
+        index.init_index(max_elements=max(self._capacity, 1024), ef_construction=200, M=16)
+        index.set_ef(max(64, settings.MAX_RETRIEVAL_RESULTS * 4))
+        alive_rows = np.flatnonzero(self._alive)
+        if len(alive_rows):
+            index.add_items(np.asarray(self._matrix[alive_rows]), alive_rows)
+        self._hnsw = index
+
+    def upsert(self, ids, vectors, payloads):
+        vectors = normalize(vectors)
+        with self._lock, self._file_lock:
+            self._refresh()
+            rows = []
+            for point_id in ids:
+                row = self._id_to_row.get(point_id)
+                if row is None:
+                    row = self._free_rows.pop() if self._free_rows else len(self._row_ids)
+                    if row == len(self._row_ids):
+                        self._row_ids.append(None)
+                        self._row_sources.append(None)
+                    self._id_to_row[point_id] = row
+                rows.append(row)
+
+            self._grow(len(self._row_ids))
+            rows_array = np.asarray(rows, dtype=np.int64)
+            self._matrix[rows_array] = vectors
+            self._matrix.flush()
+            if self._codes is not None:
+                self._codes[rows_array] = self._encode_rows(vectors)
+
+            touched_sources = set()
+            for row, point_id, payload in zip(rows, ids, payloads):
+                touched_sources.add(self._row_sources[row])
+                self._row_ids[row] = point_id
+                self._row_sources[row] = payload.get("source_id")
+                touched_sources.add(self._row_sources[row])
+            self._alive[rows_array] = True
+            self._invalidate_masks(touched_sources)
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (row, point_id, source_id, payload) VALUES (?, ?, ?, ?)",
+                [
+                    (row, point_id, payload.get("source_id"), json.dumps(payload))
+                    for row, point_id, payload in zip(rows, ids, payloads)
+                ]
+            )
+            self._seq = self._log_changes(rows)
+            self._conn.commit()
+
+            if self._hnsw is not None:
+                self._hnsw.add_items(vectors, rows_array)
+
+            # int8 scales drift as the corpus grows; retrain when it has doubled
+            if self.quantization == "int8" and self.count() >= 2 * max(self._quantized_on, 512):
+                self._retrain_quantization()
+
+    def delete(self, ids):
+        with self._lock, self._file_lock:
+            self._refresh()
+            rows = [self._id_to_row.pop(point_id) for point_id in ids if point_id in self._id_to_row]
+            if not rows:
+                return
+            touched_sources = {self._row_sources[row] for row in rows}
+            for row in rows:
+                self._row_ids[row] = None
+                self._row_sources[row] = None
+                self._alive[row] = False
+                self._free_rows.append(row)
+                if self._hnsw is not None:
+                    self._hnsw.mark_deleted(row)
+            self._invalidate_masks(touched_sources)
+
+            self._conn.executemany("DELETE FROM rows WHERE row = ?", [(row,) for row in rows])
+            self._seq = self._log_changes(rows)
+            self._conn.commit()
+
+    def update_payloads(self, ids, payloads):
+        with self._lock, self._file_lock:
+            self._refresh()
+            rows = [self._id_to_row.get(point_id) for point_id in ids]
+            known = [(row, payload) for row, payload in zip(rows, payloads) if row is not None]
+            for start in range(0, len(known), 500):
+                batch = known[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                stored = dict(self._conn.execute(
+                    f"SELECT row, payload FROM rows WHERE row IN ({placeholders})",
+                    [row for row, _ in batch]
+                ).fetchall())
+                self._conn.executemany(
+                    "UPDATE rows SET payload = ? WHERE row = ?",
+                    [(json.dumps({**json.loads(stored.get(row) or "{}"), **payload}), row) for row, payload in batch]
+                )
+            self._conn.commit()
+
+    def _invalidate_masks(self, source_ids):
+        for source_id in source_ids:
+            self._source_masks.pop(source_id, None)
+
+    def _source_rows(self, source_id: str) -> np.ndarray:
+        """Row indices belonging to a source, cached until that source changes"""
+        rows = self._source_masks.get(source_id)
+        if rows is None:
+            rows = np.fromiter(
+                (row for row, row_source in enumerate(self._row_sources) if row_source == source_id),
+                dtype=np.int64
+            )
+            self._source_masks[source_id] = rows
+        return rows
+
+    def search(self, query_vector, source_id=None, limit=10, score_threshold=0.0, exact=False):
+        query = normalize(query_vector).reshape(-1)
+        source_id = source_id or None  # An empty source_id is no filter, as in QdrantBackend
+        with self._lock:
+            self._refresh()
+            size = len(self._row_ids)
+            if size == 0:
+                return []
+
+            rows = self._source_rows(source_id) if source_id is not None else None
+            if self._hnsw is not None and source_id is None and not exact:
+                rows, scores = self._search_hnsw(query, limit)
+            elif self._codes is not None and not exact:
+                rows, scores = self._search_quantized(query, rows, size, limit)
+            else:
+                if rows is not None:
+                    scores = self._matrix[rows] @ query
+                else:
+                    rows = np.arange(size)
+                    scores = self._matrix[:size] @ query
+                    scores[~self._alive[:size]] = -np.inf
+                rows, scores = _top_k(rows, scores, limit)
+
+            hits = [(int(row), float(score)) for row, score in zip(rows, scores) if score >= score_threshold]
+            return self._build_results(hits)
+
+    def search_batch(self, query_vectors, source_ids, limits, score_thresholds):
+        """Exact searches grouped by source and scored as one matrix product per group"""
+        if self._hnsw is not None or self._codes is not None:
+            return super().search_batch(query_vectors, source_ids, limits, score_thresholds)
+
+        queries = normalize(query_vectors)
+        results: List[List[Dict[str, Any]]] = [[] for _ in range(len(queries))]
+        groups: Dict[Optional[str], List[int]] = {}
+        for i, source_id in enumerate(source_ids):
+            groups.setdefault(source_id or None, []).append(i)
+
+        with self._lock:
+            self._refresh()
+            size = len(self._row_ids)
+            if size == 0:
+                return results
+            for source_id, members in groups.items():
+                if source_id is not None:
+                    rows = self._source_rows(source_id)
+                    scores = self._matrix[rows] @ queries[members].T
+                else:
+                    rows = np.arange(size)
+                    scores = self._matrix[:size] @ queries[members].T
+                    scores[~self._alive[:size]] = -np.inf
+                for column, i in enumerate(members):
+                    top_rows, top_scores = _top_k(rows, scores[:, column], limits[i])
+                    hits = [
+                        (int(row), float(score)) for row, score in zip(top_rows, top_scores)
+                        if score >= score_thresholds[i]
+                    ]
+                    results[i] = self._build_results(hits)
+        return results
+
+    def _search_quantized(self, query: np.ndarray, rows: Optional[np.ndarray], size: int, limit: int):
+        """Score codes first, then re-rank the best candidates in float32"""
+        if rows is None:
+            rows = np.flatnonzero(self._alive[:size])
+        # With no gaps, blocks are read as slices of the code matrix instead of gathered
+        contiguous = len(rows) > 0 and rows[-1] - rows[0] + 1 == len(rows)
+
+        def code_block(start: int, end: int) -> np.ndarray:
+            end = min(end, len(rows))
+            if contiguous:
+                return self._codes[rows[0] + start:rows[0] + end]
+            return self._codes[rows[start:end]]
+
+        scores = np.empty(len(rows), dtype=np.float32)
+        if self.quantization == "int8":
+            # Asymmetric scoring: float query against dequantized codes, cast a
+            # cache-sized block at a time into one reused buffer
+            weighted_query = query * self._int8_scales
+            buffer = np.empty((min(_INT8_CAST_ROWS, len(rows)), self._codes.shape[1]), dtype=np.float32)
+            for start in range(0, len(rows), _INT8_CAST_ROWS):
+                codes = code_block(start, start + _INT8_CAST_ROWS)
+                cast = buffer[:len(codes)]
+                np.copyto(cast, codes, casting="unsafe")
+                np.dot(cast, weighted_query, out=scores[start:start + len(codes)])
+            candidate_count = limit * self.rescore_factor
+        else:
+            query_code = binarize(query)
+            for start in range(0, len(rows), _SCORE_BLOCK_ROWS):
+                codes = code_block(start, start + _SCORE_BLOCK_ROWS)
+                scores[start:start + len(codes)] = hamming_similarity(codes, query_code)
+            # Sign bits rank neighbours coarsely; re-score a share of the corpus
+            candidate_count = max(limit * self.rescore_factor,
+                                  int(len(rows) * settings.VECTOR_BINARY_CANDIDATE_FRACTION))
+
+        candidates, _ = _top_k(rows, scores, candidate_count)
+        # Sorted row order keeps memory-mapped reads sequential
+        candidates = np.sort(candidates)
+        return _top_k(candidates, self._matrix[candidates] @ query, limit)
+
+    def _search_hnsw(self, query: np.ndarray, limit: int):
+        alive_count = int(self._alive.sum())
+        if alive_count == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        labels, distances = self._hnsw.knn_query(query, k=min(limit, alive_count))
+        # Inner-product space reports 1 - similarity as the distance
+        return labels[0], 1.0 - distances[0]
+
+    def _build_results(self, hits):
+        if not hits:
+            return []
+        placeholders = ",".join("?" * len(hits))
+        payloads = dict(self._conn.execute(
+            f"SELECT row, payload FROM rows WHERE row IN ({placeholders})",
+            [row for row, _ in hits]
+        ).fetchall())
+        return [
+            {
+                "id": self._row_ids[row],
+                "score": score,
+                "payload": json.loads(payloads[row]) if row in payloads else {}
+            }
+            for row, score in hits
+        ]
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return int(self._alive.sum())
+
+    def get_stats(self) -> Dict[str, Any]:
+        size = len(self._row_ids)
+        return {
+            "count": self.count(),
+            "capacity": self._capacity,
+            "index": self.index_type,
+            "quantization": self.quantization,
+            "float32_bytes": size * self.dimension * 4,
+            "code_bytes": int(self._codes[:size].nbytes) if self._codes is not None else 0
+        }
+
+def _top_k(rows: np.ndarray, scores: np.ndarray, limit: int):
+    """Highest-scoring rows in descending order without a full sort"""
+    if len(scores) > limit:
+        candidates = np.argpartition(-scores, limit - 1)[:limit]
+    else:
+        candidates = np.arange(len(scores))
+    order = candidates[np.argsort(-scores[candidates])]
+    return rows[order], scores[order]
+
+def measure_recall(backend: VectorBackend, queries: np.ndarray, k: int = 10) -> Dict[str, Any]:
+    """Recall@k and latency of the default search path against exact search"""
+    recalls, exact_latencies, fast_latencies = [], [], []
+    for query in as_float32(queries):
+        started = time.perf_counter()
+        expected = backend.search(query, limit=k, score_threshold=-1.0, exact=True)
+        exact_latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        found = backend.search(query, limit=k, score_threshold=-1.0)
+        fast_latencies.append(time.perf_counter() - started)
+
+        expected_ids = {hit["id"] for hit in expected}
+        if expected_ids:
+            recalls.append(len(expected_ids & {hit["id"] for hit in found}) / len(expected_ids))
+
+    def latency_ms(samples, percent):
+        return float(np.percentile(samples, percent) * 1000) if samples else None
+
+    return {
+        "k": k,
+        "queries": len(recalls),
+        "recall_at_k": float(np.mean(recalls)) if recalls else None,
+        "exact_latency_ms_p50": latency_ms(exact_latencies, 50),
+        "exact_latency_ms_p95": latency_ms(exact_latencies, 95),
+        "search_latency_ms_p50": latency_ms(fast_latencies, 50),
+        "search_latency_ms_p95": latency_ms(fast_latencies, 95)
+    }
+
+_vector_backend: Optional[VectorBackend] = None
+_vector_backend_lock = threading.Lock()
+
+def get_vector_backend() -> VectorBackend:
+    """Return the process-wide backend selected by settings.VECTOR_BACKEND"""
+    global _vector_backend
+    if _vector_backend is None:
+        with _vector_backend_lock:
+            if _vector_backend is None:
+                if settings.VECTOR_BACKEND == "local":
+                    _vector_backend = LocalVectorBackend()
+                elif settings.VECTOR_BACKEND == "qdrant":
+                    _vector_backend = QdrantBackend()
+                else:
+                    raise ValueError(f"Unknown VECTOR_BACKEND: {settings.VECTOR_BACKEND}")
+    return _vector_backend
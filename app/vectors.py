@@ -0,0 +1,75 @@
+from typing import Tuple
+import json
+import numpy as np
+
+# Vectors are always stored little-endian regardless of host byte order
+FLOAT32 = np.dtype("<f4")
+INT8_SCALE = np.dtype("<f4")
+
+def as_float32(vector) -> np.ndarray:
+    """Return the vector (or matrix) as a contiguous float32 ndarray"""
+    return np.ascontiguousarray(vector, dtype=np.float32)
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize a vector or the rows of a matrix"""
+    vectors = as_float32(vectors)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def quantize_int8(vector: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Symmetric int8 quantization; returns the codes and their scale"""
+    vector = as_float32(vector)
+    max_abs = float(np.max(np.abs(vector))) if vector.size else 0.0
+    scale = max_abs / 127 if max_abs else 1.0
+    codes = np.clip(np.round(vector / scale), -127, 127).astype(np.int8)
+    return codes, scale
+
+def dequantize_int8(codes: np.ndarray, scale: float) -> np.ndarray:
+    return codes.astype(np.float32) * np.float32(scale)
+
+def encode_vector(vector, quantization: str = "float32") -> bytes:
+    """Serialize a 1-D vector to bytes.
+
+    float32: raw little-endian float32 values (4 bytes per dimension).
+    int8: a little-endian float32 scale followed by one byte per dimension.
+    """
+    if quantization == "float32":
+        return as_float32(vector).astype(FLOAT32, copy=False).tobytes()
+    if quantization == "int8":
+        codes, scale = quantize_int8(vector)
+        return np.array([scale], dtype=INT8_SCALE).tobytes() + codes.tobytes()
+    raise ValueError(f"Unsupported vector quantization: {quantization}")
+
+def decode_vector(data, quantization: str = "float32") -> np.ndarray:
+    """Inverse of encode_vector; also accepts legacy JSON-encoded lists"""
+    if isinstance(data, str):
+        return as_float32(json.loads(data))
+    if isinstance(data, (list, tuple)):
+        return as_float32(data)
+    if quantization == "float32":
+        return np.frombuffer(data, dtype=FLOAT32).astype(np.float32)
+    if quantization == "int8":
+        scale = float(np.frombuffer(data[:4], dtype=INT8_SCALE)[0])
+        codes = np.frombuffer(data[4:], dtype=np.int8)
+        return dequantize_int8(codes, scale)
+    raise ValueError(f"Unsupported vector quantization: {quantization}")
+
+def quantize_rows_int8(vectors: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Quantize matrix rows with per-dimension scales (value = code * scale)"""
+    return np.clip(np.round(as_float32(vectors) / scales), -127, 127).astype(np.int8)
+
+def binarize(vectors: np.ndarray) -> np.ndarray:
+    """Pack the sign bit of every dimension, 1 bit per dimension"""
+    return np.packbits(as_float32(vectors) > 0, axis=-1)
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def hamming_similarity(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    """Negated Hamming distance between packed rows and a packed query"""
+    differing_bits = np.bitwise_xor(codes, query_code)
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0, a hardware popcount
+        differing = np.bitwise_count(differing_bits).sum(axis=-1, dtype=np.int32)
+    else:
+        differing = _POPCOUNT[differing_bits].sum(axis=-1, dtype=np.int32)
+    return -differing.astype(np.float32)
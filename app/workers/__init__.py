@@ -1,13 +1,37 @@
-from redis import Redis
-from rq import Queue
+from typing import Dict
 import os
 
-# Redis connection
-redis_conn = Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"))
+try:
+    from redis import Redis
+    from rq import Queue
+except ImportError:
+    # redis/rq are optional; without them jobs run in-process (see app/jobs.py)
+    Redis = Queue = None
 
-# Task queues
-task_queue = Queue("content_tasks", connection=redis_conn)
-embedding_queue = Queue("embedding_tasks", connection=redis_conn)
-generation_queue = Queue("generation_tasks", connection=redis_conn)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 
-__all__ = ["task_queue", "embedding_queue", "generation_queue"]
+# Queue names. Embedding work (chunking, embedding, indexing) is CPU-bound;
+# generation work waits on LLM calls. Each has its own worker pool.
+CONTENT_QUEUE = "content_tasks"
+EMBEDDING_QUEUE = "embedding_tasks"
+GENERATION_QUEUE = "generation_tasks"
+
+def create_queues(connection: "Redis", is_async: bool = True) -> Dict[str, "Queue"]:
+    """Queues bound to `connection`, e.g. a fakeredis instance in tests"""
+    return {
+        name: Queue(name, connection=connection, is_async=is_async)
+        for name in (CONTENT_QUEUE, EMBEDDING_QUEUE, GENERATION_QUEUE)
+    }
+
+if Redis is not None:
+    # Redis connection; fail fast so callers can fall back to the in-process runner
+    redis_conn = Redis.from_url(REDIS_URL, socket_connect_timeout=5, socket_timeout=5)
+
+    # Task queues
+    task_queue = Queue(CONTENT_QUEUE, connection=redis_conn)
+    embedding_queue = Queue(EMBEDDING_QUEUE, connection=redis_conn)
+    generation_queue = Queue(GENERATION_QUEUE, connection=redis_conn)
+else:
+    redis_conn = task_queue = embedding_queue = generation_queue = None
+
+__all__ = ["task_queue", "embedding_queue", "generation_queue", "create_queues", "redis_conn"]
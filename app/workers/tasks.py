@@ -0,0 +1,79 @@
+from typing import Dict, List, Optional
+import asyncio
+import time
+
+from ..database import SessionLocal
+from ..jobs import progress_reporter, update_job
+from ..llm import close_http_session
+from ..models import GeneratedContent
+from ..services import ContentService, GenerationService
+
+# RQ job functions. Each job opens its own database session; the embedding
+# model and vector backend are process-wide singletons, so a worker that
+# preloaded them (see worker.py) reuses them for every job it runs.
+
+def process_text(source_id: str, file_path: str) -> bool:
+    db = SessionLocal()
+    try:
+        return ContentService(db, progress_reporter()).process_text_content(source_id, file_path)
+    finally:
+        db.close()
+
+def process_audio(source_id: str, file_path: str) -> bool:
+    db = SessionLocal()
+    try:
+        return ContentService(db, progress_reporter()).process_audio_content(source_id, file_path)
+    finally:
+        db.close()
+
+def reprocess_text(source_id: str, file_path: str) -> Dict[str, int]:
+    db = SessionLocal()
+    try:
+        return ContentService(db, progress_reporter()).reprocess_text_content(source_id, file_path)
+    finally:
+        db.close()
+
+def generate_content(job_id: str, source_id: str, content_types: List[str],
+                     custom_prompts: Optional[Dict[str, str]] = None,
+                     user_id: str = "demo_user", bypass_cache: bool = False) -> str:
+    """Generate every requested format and store them as one GeneratedContent row.
+    
+    Formats are published on the job row as they complete, so clients polling
+    the job see partial results before the slowest format is done.
+    """
+    db = SessionLocal()
+    content_types = list(dict.fromkeys(content_types))
+    partial: Dict[str, Dict] = {}
+    
+    async def on_result(content_type: str, result: Dict):
+        partial[content_type] = result
+        # The commit runs on a thread so the other formats' LLM calls keep going
+        await asyncio.to_thread(
+            update_job, job_id, progress=round(len(partial) / len(content_types), 4),
+            message=f"Generated {content_type}", result=dict(partial)
+        )
+    
+    async def generate():
+        try:
+            return await GenerationService(db).generate_content(
+                source_id, content_types, custom_prompts, on_result=on_result, bypass_cache=bypass_cache
+            )
+        finally:
+            await close_http_session()
+    
+    try:
+        started = time.perf_counter()
+        results = asyncio.run(generate())
+        generated = GeneratedContent(
+            source_id=source_id,
+            job_id=job_id,
+            content_type=content_types[0] if len(content_types) == 1 else "multi",
+            content=results,
+            generation_time=time.perf_counter() - started,
+            user_id=user_id
+        )
+        db.add(generated)
+        db.commit()
+        return generated.id
+    finally:
+        db.close()
@@ -0,0 +1,78 @@
+"""Worker pools for the RQ queues.
+
+    python -m app.workers.worker embedding
+    python -m app.workers.worker generation --concurrency 8
+    python -m app.workers.worker all --burst
+
+Each pool runs `concurrency` processes. A process loads the models it needs
+once, then runs jobs in-process with SimpleWorker so they stay loaded
+between jobs. Queues are listed in priority order: a worker always drains
+the first queue before taking work from the next.
+"""
+from typing import List, Optional
+import argparse
+import multiprocessing
+import os
+
+from redis import Redis
+from rq import Queue, SimpleWorker
+
+from . import REDIS_URL, CONTENT_QUEUE, EMBEDDING_QUEUE, GENERATION_QUEUE
+from ..config import settings
+
+WORKER_POOLS = {
+    # content_tasks holds ingestion jobs enqueued before the queues were split
+    "embedding": {"queues": [EMBEDDING_QUEUE, CONTENT_QUEUE], "concurrency": settings.EMBEDDING_WORKER_CONCURRENCY},
+    "generation": {"queues": [GENERATION_QUEUE], "concurrency": settings.GENERATION_WORKER_CONCURRENCY}
+}
+
+def preload(pool: str, concurrency: int = 1):
+    """Load everything the pool's jobs need before the first job arrives"""
+    from ..services import get_embedding_service
+    from ..vector_store import get_vector_backend
+
+    if pool == "embedding" and concurrency > 1:
+        # Split the cores between processes instead of oversubscribing them
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // concurrency))
+
+    # Generation also embeds the retrieval query, so both pools need the model
+    get_embedding_service().warm_up()
+    get_vector_backend()
+
+def run_worker(pool: str, connection: Optional[Redis] = None, burst: bool = False,
+               concurrency: int = 1) -> bool:
+    """Run one worker process for `pool` until stopped (or, with burst, until its queues are empty)"""
+    connection = connection or Redis.from_url(REDIS_URL)
+    preload(pool, concurrency)
+    queues = [Queue(name, connection=connection) for name in WORKER_POOLS[pool]["queues"]]
+    worker = SimpleWorker(queues, connection=connection, name=f"{pool}-{os.getpid()}")
+    return worker.work(burst=burst)
+
+def run_pools(pools: List[str], concurrency: Optional[int] = None, burst: bool = False):
+    processes = []
+    for pool in pools:
+        count = concurrency or WORKER_POOLS[pool]["concurrency"]
+        for index in range(count):
+            process = multiprocessing.Process(
+                target=run_worker, args=(pool,), kwargs={"burst": burst, "concurrency": count},
+                name=f"{pool}-worker-{index}"
+            )
+            process.start()
+            processes.append(process)
+    print(f"🚀 Started {len(processes)} worker processes for {', '.join(pools)}")
+    for process in processes:
+        process.join()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run RQ worker pools")
+    parser.add_argument("pool", choices=list(WORKER_POOLS) + ["all"])
+    parser.add_argument("--concurrency", type=int, default=None, help="Processes per pool")
+    parser.add_argument("--burst", action="store_true", help="Exit once the queues are empty")
+    args = parser.parse_args()
+
+    pools = list(WORKER_POOLS) if args.pool == "all" else [args.pool]
+    run_pools(pools, concurrency=args.concurrency, burst=args.burst)
+
+if __name__ == "__main__":
+    main()
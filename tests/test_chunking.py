@@ -0,0 +1,52 @@
+import io
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.chunking import TokenChunker, iter_sentences
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def chunk_spans(text, **kwargs):
+    chunker = TokenChunker(count_words, anchor=lambda sentence: sentence.startswith("Anchor"), **kwargs)
+    return list(chunker.chunk(iter_sentences(io.StringIO(text))))
+
+
+def chunk_text(text, **kwargs):
+    return [span.text for span in chunk_spans(text, **kwargs)]
+
+
+def assert_no_overlap_only_chunks(text, **kwargs):
+    spans = chunk_spans(text, **kwargs)
+    for previous, span in zip(spans, spans[1:]):
+        # A chunk made only of the previous chunk's overlap ends where that chunk did
+        assert span.end > previous.end, (previous.text, span.text)
+
+
+def test_anchor_flush_does_not_repeat_its_overlap_as_a_chunk():
+    text = "a b c d. Anchor x. s1 s2 s3 s4 s5 s6 s7 s8 s9."
+    assert chunk_text(text, max_tokens=10, overlap_tokens=4) == [
+        "a b c d. Anchor x.",
+        "s1 s2 s3 s4 s5 s6 s7 s8 s9.",
+    ]
+    assert_no_overlap_only_chunks(text, max_tokens=10, overlap_tokens=4)
+
+
+def test_trailing_anchor_is_not_repeated_at_end_of_input():
+    text = "a b c d. Anchor x."
+    assert chunk_text(text, max_tokens=10, overlap_tokens=4) == ["a b c d. Anchor x."]
+
+
+def test_chunks_overlap_and_advance():
+    sentences = [f"{'Anchor' if i % 3 == 0 else 'Plain'} w{i} x{i}." for i in range(40)]
+    text = " ".join(sentences)
+    chunks = chunk_text(text, max_tokens=8, overlap_tokens=3)
+    assert len(chunks) > 1
+    # Every sentence lands in some chunk
+    for sentence in sentences:
+        assert any(sentence in chunk for chunk in chunks)
+    assert_no_overlap_only_chunks(text, max_tokens=8, overlap_tokens=3)
@@ -0,0 +1,54 @@
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("sentence_transformers")
+
+from app.config import settings
+from app import services
+
+
+class ConcurrencyCheckingModel:
+    """Stand-in model that records how many encode() calls overlap"""
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def encode(self, texts):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.01)
+        with self._lock:
+            self.active -= 1
+        texts = [texts] if isinstance(texts, str) else texts
+        return np.array([[float(len(text))] * self.dimension for text in texts], dtype=np.float32)
+
+
+def test_encode_is_serialized_across_threads(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_PATH", None)
+    service = services.EmbeddingService()
+    model = ConcurrencyCheckingModel(service.dimension)
+    service._model = model
+
+    results = {}
+
+    def embed(worker: int):
+        texts = [f"worker {worker} text {i}" for i in range(5)]
+        results[worker] = (texts, service.get_embeddings_batch(texts))
+
+    threads = [threading.Thread(target=embed, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert model.max_active == 1
+    for texts, embeddings in results.values():
+        assert embeddings.shape == (len(texts), service.dimension)
+        assert [row[0] for row in embeddings] == [float(len(text)) for text in texts]
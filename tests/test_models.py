@@ -0,0 +1,55 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+sqlalchemy = pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, text
+
+from app.models import Base, migrate_chunk_embeddings
+from app.vectors import decode_vector
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def insert_chunks(engine, embeddings):
+    with engine.begin() as conn:
+        # Foreign keys are not enforced by SQLite by default
+        for index, (chunk_id, embedding) in enumerate(embeddings.items()):
+            conn.execute(
+                text(
+                    "INSERT INTO content_chunks (id, source_id, chunk_text, chunk_index, embedding) "
+                    "VALUES (:id, 'source', 'text', :index, :embedding)"
+                ),
+                {"id": chunk_id, "index": index, "embedding": embedding}
+            )
+
+
+def stored_embeddings(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(text("SELECT id, embedding FROM content_chunks")).fetchall())
+
+
+def test_migrate_converts_json_and_clears_unusable_values(engine):
+    insert_chunks(engine, {
+        "a-valid": "[0.5, -1.0, 2.0]",
+        "b-null": "null",
+        "c-empty": "[]",
+        "d-malformed": "[0.5,",
+        "e-not-numbers": '["x", "y"]',
+        "f-missing": None,
+    })
+
+    assert migrate_chunk_embeddings(engine, batch_size=2) == {"converted": 1, "skipped": 4}
+
+    stored = stored_embeddings(engine)
+    np.testing.assert_allclose(decode_vector(stored["a-valid"]), [0.5, -1.0, 2.0])
+    for chunk_id in ("b-null", "c-empty", "d-malformed", "e-not-numbers", "f-missing"):
+        assert stored[chunk_id] is None
+
+    # Converted and cleared rows are not picked up again
+    assert migrate_chunk_embeddings(engine) == {"converted": 0, "skipped": 0}
@@ -0,0 +1,43 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.vector_store import LocalVectorBackend, measure_recall
+
+
+def build_backend(path, quantization, vectors):
+    backend = LocalVectorBackend(path=str(path), dimension=vectors.shape[1], quantization=quantization)
+    ids = [f"point-{i}" for i in range(len(vectors))]
+    backend.upsert(ids, vectors, [{"source_id": f"source-{i % 3}"} for i in range(len(vectors))])
+    return backend, ids
+
+
+@pytest.mark.parametrize("quantization, min_recall", [("int8", 0.95), ("binary", 0.8)])
+def test_quantized_search_matches_exact_search(tmp_path, quantization, min_recall):
+    # Random vectors at the model's dimension: a worst case for quantization
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(20000, 384)).astype(np.float32)
+    queries = rng.normal(size=(20, 384)).astype(np.float32)
+    backend, ids = build_backend(tmp_path, quantization, vectors)
+
+    assert measure_recall(backend, queries, k=10)["recall_at_k"] >= min_recall
+
+    # Deleted rows leave gaps, so codes are gathered instead of sliced
+    backend.delete(ids[::7])
+    assert measure_recall(backend, queries, k=10)["recall_at_k"] >= min_recall
+    deleted = set(ids[::7])
+    assert not deleted & {hit["id"] for hit in backend.search(queries[0], limit=50, score_threshold=-1.0)}
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_quantized_search_finds_a_stored_vector(tmp_path, quantization):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(3000, 64)).astype(np.float32)
+    backend, ids = build_backend(tmp_path, quantization, vectors)
+
+    hits = backend.search(vectors[1234], limit=1)
+    assert hits[0]["id"] == ids[1234]
+    assert hits[0]["score"] == pytest.approx(1.0, abs=1e-5)
+
+    filtered = backend.search(vectors[1234], source_id="source-1", limit=5, score_threshold=-1.0)
+    assert all(hit["payload"]["source_id"] == "source-1" for hit in filtered)